@@ -1,23 +1,91 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, make_response, Response
+from flask.json.provider import DefaultJSONProvider
 import json
 import hashlib
+import hmac
 import os
 import uuid
 from datetime import datetime
 from pathlib import Path
-import shutil
+import tempfile
+import threading
+import traceback
+import time
+import atexit
+import gzip
+from functools import wraps
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict, Counter, OrderedDict
+
+try:
+    import orjson
+except ImportError:
+    # orjson为可选依赖，未安装时回退到标准库json
+    orjson = None
+
+try:
+    from flask_compress import Compress
+except ImportError:
+    # flask-compress为可选依赖，未安装时响应不压缩
+    Compress = None
+
+try:
+    import fcntl
+except ImportError:
+    # Windows没有fcntl：不做跨进程加锁（Windows上也不会以多进程方式部署）
+    fcntl = None
+
+try:
+    import zstandard
+except ImportError:
+    # zstandard为可选依赖，未安装时数据文件只能使用gzip压缩
+    zstandard = None
 
 # 导入SQLite存储类
-from database import SQLiteStorage, check_migration_needed
+from database import SQLiteStorage, check_migration_needed, new_id
 from database.migrate_from_json import migrate_from_json
 
 app = Flask(__name__)
 
+# 配置缓存：文件(mtime_ns, size)未变化时直接复用解析结果和口令哈希
+_CONFIG_CACHE = {"key": None, "config": None, "password_hash": None, "password_hash_bytes": None}
+_CONFIG_LOCK = threading.Lock()
+
+def _config_file_key():
+    """获取config.json的(mtime_ns, size)，文件不存在时返回None"""
+    try:
+        st = os.stat('config.json')
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
 def load_config():
-    """加载配置文件"""
+    """加载配置文件（按文件修改时间缓存）"""
+    key = _config_file_key()
+    if key is not None and key == _CONFIG_CACHE["key"]:
+        return _CONFIG_CACHE["config"]
+
+    with _CONFIG_LOCK:
+        # 等待锁期间其它线程可能已经重新加载过
+        if key is not None and key == _CONFIG_CACHE["key"]:
+            return _CONFIG_CACHE["config"]
+        config = _read_config()
+        password = config.get('admin_password', 'admin123')
+        password_hash = hashlib.sha256(password.encode()).hexdigest()
+        _CONFIG_CACHE.update(
+            # 使用读取前的文件标识：读取期间文件若被修改，下次调用会发现不一致并重新读取
+            key=key if key is not None else _config_file_key(),
+            config=config,
+            password_hash=password_hash,
+            password_hash_bytes=password_hash.encode(),
+        )
+        return config
+
+def _read_config():
+    """从磁盘读取配置文件，不存在时写入默认配置"""
     try:
-        with open('config.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return json_loads(Path('config.json').read_bytes())
     except FileNotFoundError:
         # 默认配置
         default_config = {
@@ -27,91 +95,769 @@ def load_config():
             "port": 5001,
             "debug": True
         }
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(default_config, f, ensure_ascii=False, indent=2)
+        Path('config.json').write_bytes(json_dumps(default_config))
         return default_config
 
 def get_admin_password_hash():
-    """获取管理员口令的哈希值"""
-    config = load_config()
-    password = config.get('admin_password', 'admin123')
-    return hashlib.sha256(password.encode()).hexdigest()
+    """获取管理员口令的哈希值（随配置缓存，仅在配置文件变化时重新计算）"""
+    load_config()
+    return _CONFIG_CACHE["password_hash"]
 
 def verify_password(password_hash):
-    """验证口令"""
-    return password_hash == get_admin_password_hash()
+    """验证口令（常量时间比较，避免时序侧信道）"""
+    if not isinstance(password_hash, str):
+        return False
+    load_config()
+    # 客户端提交的值可能含非ASCII字符，统一按bytes比较；服务端哈希的bytes形式已随配置缓存
+    return hmac.compare_digest(password_hash.encode(), _CONFIG_CACHE["password_hash_bytes"])
 
 def is_debug_mode():
     """检查是否为debug模式"""
     config = load_config()
     return config.get('debug', False)
 
+def json_loads(raw):
+    """解析JSON（bytes或str），优先使用orjson"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def json_dumps(obj, indent=True):
+    """序列化为UTF-8编码的JSON bytes，优先使用orjson"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+class ORJSONProvider(DefaultJSONProvider):
+    """基于orjson的Flask JSON提供器，jsonify及请求体解析都经由orjson完成"""
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        if kwargs.get("sort_keys"):
+            option |= orjson.OPT_SORT_KEYS
+        # orjson无法处理的类型交给Flask默认的转换逻辑
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """jsonify直接使用orjson输出的bytes构造响应，省去先解码为str再编码的往返"""
+        obj = self._prepare_response_obj(args, kwargs)
+        option = orjson.OPT_NON_STR_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=option),
+            mimetype=self.mimetype,
+        )
+
+if orjson is not None:
+    app.json = ORJSONProvider(app)
+# API响应不缩进、不排序键（debug模式下也一样），减少序列化开销和响应体积
+app.json.compact = True
+app.json.sort_keys = False
+
+def get_json_body():
+    """解析请求体JSON（整个请求只解析一次），请求体为空或不是对象时返回空字典"""
+    raw = request.get_data(cache=True)
+    if not raw:
+        return {}
+    body = json_loads(raw)
+    return body if isinstance(body, dict) else {}
+
+def synchronized(method):
+    """在存储实例的锁内执行方法，保证“读取-修改-保存”过程不被并发请求打断"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+# 默认分类（只读模板，使用时通过_default_categories()复制）
+_DEFAULT_CATEGORIES = (
+    {"id": "1", "name": "编程", "color": "#3B82F6", "description": "编程相关提示词", "parent_id": None, "level": 1, "path": "编程"},
+    {"id": "2", "name": "写作", "color": "#10B981", "description": "写作相关提示词", "parent_id": None, "level": 1, "path": "写作"},
+    {"id": "3", "name": "分析", "color": "#F59E0B", "description": "分析相关提示词", "parent_id": None, "level": 1, "path": "分析"},
+    {"id": "4", "name": "创意", "color": "#8B5CF6", "description": "创意相关提示词", "parent_id": None, "level": 1, "path": "创意"},
+    {"id": "5", "name": "商业", "color": "#EF4444", "description": "商业相关提示词", "parent_id": None, "level": 1, "path": "商业"},
+    {"id": "6", "name": "教育", "color": "#06B6D4", "description": "教育相关提示词", "parent_id": None, "level": 1, "path": "教育"},
+    {"id": "7", "name": "其他", "color": "#6B7280", "description": "其他类型提示词", "parent_id": None, "level": 1, "path": "其他"},
+)
+
+def _default_categories():
+    """返回默认分类的可修改副本"""
+    return [dict(cat) for cat in _DEFAULT_CATEGORIES]
+
+# 本进程已锁定的数据目录（锁文件路径 -> 打开的锁文件）。每个目录只打开一次锁文件并保持到进程退出，
+# 同一进程内重复打开同一目录时直接复用，关闭或回收某个FileStorage实例都不会释放锁
+_DATA_DIR_LOCKS = {}
+_DATA_DIR_LOCKS_GUARD = threading.Lock()
+
 # 重构后的统一存储逻辑
 class FileStorage:
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", pretty: bool = False, compress: bool = False,
+                 search_index: bool = False):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
+        self._acquire_process_lock()
         
-        self.data_file = self.data_dir / "prompts.json"
+        # 数据文件的压缩格式（文件小、写入快，但无法直接查看）：True/"gzip"为gzip，"zstd"为zstd，
+        # zstd压缩更快、压缩率更高，需要安装zstandard，未安装时回退到gzip
+        if compress is True:
+            compress = "gzip"
+        if compress == "zstd" and zstandard is None:
+            print("[WARNING] 未安装zstandard，数据文件改用gzip压缩")
+            compress = "gzip"
+        if compress not in (False, None, "gzip", "zstd"):
+            raise ValueError(f"不支持的压缩格式: {compress}")
+        self.compress = compress or None
+        self.legacy_file = self.data_dir / "prompts.json"
+        # 各压缩格式对应的数据文件，切换压缩配置后首次启动时从最新的文件转换
+        self._data_files = {
+            None: self.legacy_file,
+            "gzip": self.data_dir / "prompts.json.gz",
+            "zstd": self.data_dir / "prompts.json.zst",
+        }
+        self.data_file = self._data_files[self.compress]
+        # 是否以缩进格式写入数据文件（便于人工查看，但序列化更慢、文件更大）
+        self.pretty = pretty
+
+        # 内存中的数据为权威状态，磁盘文件由后台线程异步持久化
+        self._lock = threading.RLock()
+        self._state = None
+        self._state_key = None  # 最近一次读取/写入时文件的(mtime_ns, size)
+        # 检查文件是否被外部修改的最小间隔（秒），避免每次读取都stat一次文件
+        self._stat_interval = 1.0
+        self._next_stat = 0.0
+        # 基于内存状态维护的id索引，避免每次按id查找都线性扫描列表
+        self._prompts_by_id = {}
+        self._cats_by_id = {}
+        self._tags_by_id = {}
+        self._tags_by_name = {}
+        self._children = {}  # parent_id -> [子分类id]
+        self._lc_index = {}  # prompt_id -> 小写的"标题\0内容\0描述"，搜索时按需填充
+        # 可选的三字组倒排索引（trigram -> prompt_id集合），搜索时先求候选集再逐个确认，
+        # 避免每次搜索都扫描全部提示词的全文；会显著增加内存占用，默认关闭
+        self.search_index = search_index
+        self._gram_index = None     # 首次搜索时构建
+        self._grams_by_prompt = {}  # prompt_id -> 该提示词的三字组集合，用于增量删除
+        self._gram_stale = set()    # 内容已变化、下次搜索前需重新索引的prompt_id
+        self._max_usage_id = None   # 使用次数最多的提示词id，None表示需要重新计算
+        self._prompts_by_tag = None  # 标签名 -> prompt_id集合，首次按标签查询时构建
+        self._prompts_by_category = None  # 分类键 -> prompt_id集合，首次修改/删除分类时构建
+        self._example_cache = None  # 示例数据文件的((mtime_ns, size), 原始bytes)，文件未变化时不再读盘
+        self._pending = False   # 是否有尚未写入磁盘的修改
+        self._dirty = threading.Event()
+        self._write_lock = threading.Lock()
+        self._flush_delay = 0.1  # 合并100ms内的连续修改，只写一次文件
+        self._batch_depth = 0  # batch()嵌套层数，大于0时暂不通知写盘
+        self._batch_ops = []   # batch()期间累积的操作日志，退出时一次性写入
+        # 数据版本号：每次修改或重新加载时递增，供接口缓存和ETag判断数据是否变化
+        self._instance_id = uuid.uuid4().hex[:8]
+        self._revision = 0
+
+        # 操作日志：每次修改追加一行（由后台线程fsync），快照文件只在累积足够多操作后由后台线程重写
+        self.log_file = self.data_dir / "ops.log"
+        self.old_log_file = self.data_dir / "ops.log.old"  # 快照写入期间的上一段日志
+        self._wal = None
+        self._ops_since_snapshot = 0
+        self._compact_threshold = 500
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="FileStorageFlusher", daemon=True)
+        self._flusher.start()
+        self._log_unsynced = threading.Event()
+        self._syncer = threading.Thread(target=self._sync_loop, name="FileStorageLogSync", daemon=True)
+        self._syncer.start()
+        atexit.register(self._flush_now)
+        # 备份文件由单独的后台线程压缩写入，接口无需等待磁盘IO；退出时等待未完成的备份写完
+        self._backup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="FileStorageBackup")
+        atexit.register(self._backup_executor.shutdown, wait=True)
+
         self._init_unified_data_file()
 
-    def _init_unified_data_file(self):
-        """初始化统一数据文件"""
-        if not self.data_file.exists():
-            default_data = {
-                "prompts": [],
-                "metadata": {
-                    "categories": [
-                        {"id": "1", "name": "编程", "color": "#3B82F6", "description": "编程相关提示词", "parent_id": None, "level": 1, "path": "编程"},
-                        {"id": "2", "name": "写作", "color": "#10B981", "description": "写作相关提示词", "parent_id": None, "level": 1, "path": "写作"},
-                        {"id": "3", "name": "分析", "color": "#F59E0B", "description": "分析相关提示词", "parent_id": None, "level": 1, "path": "分析"},
-                        {"id": "4", "name": "创意", "color": "#8B5CF6", "description": "创意相关提示词", "parent_id": None, "level": 1, "path": "创意"},
-                        {"id": "5", "name": "商业", "color": "#EF4444", "description": "商业相关提示词", "parent_id": None, "level": 1, "path": "商业"},
-                        {"id": "6", "name": "教育", "color": "#06B6D4", "description": "教育相关提示词", "parent_id": None, "level": 1, "path": "教育"},
-                        {"id": "7", "name": "其他", "color": "#6B7280", "description": "其他类型提示词", "parent_id": None, "level": 1, "path": "其他"}
-                    ],
-                    "tags": [],
-                    "settings": {
-                        "last_updated": datetime.now().isoformat(),
-                        "version": "2.0"
-                    }
+    def _acquire_process_lock(self):
+        """
+        独占数据目录：内存中的数据是权威状态，多个进程各自持有一份会互相覆盖写入，
+        因此数据目录已被其它进程的FileStorage使用时拒绝启动（同一进程内可重复打开）
+        """
+        if fcntl is None:
+            return
+        # 使用flock而不是POSIX记录锁（lockf）：记录锁在进程关闭该文件的任意一个描述符时就会整体释放
+        lock_path = (self.data_dir / ".filestorage.lock").resolve()
+        with _DATA_DIR_LOCKS_GUARD:
+            if lock_path in _DATA_DIR_LOCKS:
+                return
+            lock_file = open(lock_path, 'a')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                raise RuntimeError(
+                    f"数据目录 {self.data_dir} 已被其它进程的JSON文件存储使用："
+                    "JSON文件存储只支持单进程运行，请使用单个worker（如 gunicorn -w 1）"
+                )
+            _DATA_DIR_LOCKS[lock_path] = lock_file
+
+    def _init_unified_data_file(self, flush=True):
+        """
+        初始化统一数据文件，返回初始化后的数据（数据文件已存在时返回None）
+
+        flush为False用于持有_lock的加载过程：只设置内存状态并标记快照待写，由后台线程写入文件。
+        同步写文件需要获取_write_lock，而后台线程的加锁顺序是_write_lock -> _lock，反向加锁可能死锁
+        """
+        if flush:
+            # 切换压缩配置后首次启动：其它格式的数据文件比当前格式的新时转存为当前格式（保留原文件）
+            source = self._newer_data_file()
+            if source is not None:
+                fmt, path = source
+                self._write_file(self._compress(self._decompress_as(path.read_bytes(), fmt)))
+                return None
+        if self.data_file.exists():
+            return None
+        # 运行中数据文件被删除或损坏时使用默认数据，不沿用其它格式的旧数据文件（内容已过时）
+        default_data = {
+            "prompts": [],
+            "metadata": {
+                "categories": _default_categories(),
+                "tags": [],
+                "settings": {
+                    "last_updated": datetime.now().isoformat(),
+                    "version": "2.0"
                 }
             }
-            self._save_data(default_data)
+        }
+        self._save_data(default_data)
+        if flush:
+            self._flush_now()
+        return default_data
+
+    def _newer_data_file(self):
+        """返回比当前格式的数据文件更新的其它格式数据文件(压缩格式, 路径)，没有时返回None"""
+        newest = None
+        mtime = self.data_file.stat().st_mtime_ns if self.data_file.exists() else -1
+        for fmt, path in self._data_files.items():
+            if path == self.data_file or not path.exists():
+                continue
+            if fmt == "zstd" and zstandard is None:
+                print(f"[WARNING] 未安装zstandard，忽略 {path.name}")
+                continue
+            if path.stat().st_mtime_ns > mtime:
+                newest, mtime = (fmt, path), path.stat().st_mtime_ns
+        return newest
+
+    def _file_key(self):
+        """获取数据文件的(mtime_ns, size)，文件不存在时返回None"""
+        try:
+            st = self.data_file.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
 
+    @synchronized
     def _load_data(self):
-        """加载统一数据"""
+        """加载统一数据（返回内存中的权威状态，仅在文件被外部修改时重新读取）"""
+        if self._state is not None and self._pending:
+            return self._state
+        now = time.monotonic()
+        if self._state is not None and now < self._next_stat:
+            return self._state
+        self._next_stat = now + self._stat_interval
+        key = self._file_key()
+        if key is not None and key == self._state_key:
+            return self._state
+
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-                # 兼容性处理：如果是旧格式，进行迁移
-                if "metadata" not in data and "prompts" in data:
-                    return self._migrate_from_old_format(data)
-                
-                # 确保所有必需的字段都存在
-                if "metadata" not in data:
-                    data["metadata"] = {"categories": [], "tags": [], "settings": {}}
-                if "categories" not in data["metadata"]:
-                    data["metadata"]["categories"] = []
-                if "tags" not in data["metadata"]:
-                    data["metadata"]["tags"] = []
-                if "settings" not in data["metadata"]:
-                    data["metadata"]["settings"] = {"version": "2.0", "last_updated": datetime.now().isoformat()}
-                    
-                return data
-        except (FileNotFoundError, json.JSONDecodeError):
-            # 如果文件不存在或损坏，重新初始化
-            self._init_unified_data_file()
-            return self._load_data()
-
-    def _save_data(self, data):
-        """保存统一数据"""
+            raw = self.data_file.read_bytes()
+            return self._adopt_loaded(json_loads(self._decompress(raw)), key)
+        except FileNotFoundError:
+            # 文件不存在时初始化默认数据（持有_lock，不同步写文件）
+            return self._init_unified_data_file(flush=False)
+        except (ValueError, OSError, EOFError) as e:
+            # 文件损坏（JSON或压缩格式错误）：先保留损坏的文件和操作日志以便人工恢复，再初始化默认数据。
+            # 不能直接重新加载，否则损坏的文件仍在，会无限递归
+            suffix = f".corrupt-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            for path in (self.data_file, self.old_log_file, self.log_file):
+                if path.exists():
+                    os.replace(path, path.with_name(path.name + suffix))
+            print(f"[ERROR] 数据文件损坏（{e}），已重命名为 {self.data_file.name}{suffix}，使用默认数据重新初始化")
+            return self._init_unified_data_file(flush=False)
+
+    def _adopt_loaded(self, data, key):
+        """将从文件读取的数据补全、重放操作日志后设为内存状态，key为读取前文件的(mtime_ns, size)"""
+        # 兼容性处理：如果是旧格式，进行迁移
+        migrated = "metadata" not in data and "prompts" in data
+        if migrated:
+            data = self._migrate_from_old_format(data)
+
+        # 确保所有必需的字段都存在
+        if "metadata" not in data:
+            data["metadata"] = {"categories": [], "tags": [], "settings": {}}
+        if "categories" not in data["metadata"]:
+            data["metadata"]["categories"] = []
+        if "tags" not in data["metadata"]:
+            data["metadata"]["tags"] = []
+        if "settings" not in data["metadata"]:
+            data["metadata"]["settings"] = {"version": "2.0", "last_updated": datetime.now().isoformat()}
+        self._normalize_categories(data["metadata"]["categories"])
+
+        # 在快照之上重放尚未合并进快照的操作日志
+        self._ops_since_snapshot = self._replay_ops(data)
+        self._set_state(data, key)
+        if migrated:
+            # 迁移后的新格式需要写成快照，后续操作日志才能基于它重放
+            self._save_data(data)
+        return data
+
+    def _set_state(self, data, key=None):
+        """替换内存中的权威状态并重建索引"""
+        self._state, self._state_key = data, key
+        self._revision += 1
+        self._rebuild_indexes()
+
+    @property
+    @synchronized
+    def revision(self):
+        """当前数据版本号（字符串），数据未变化时保持不变"""
+        # 文件被外部修改时_load_data会重新加载并递增版本号
+        self._load_data()
+        return f"{self._instance_id}-{self._revision}"
+
+    def _rebuild_indexes(self):
+        """根据当前状态重建id索引"""
+        data = self._state
+        self._prompts_by_id = {p["id"]: p for p in data["prompts"]}
+        self._cats_by_id = {c["id"]: c for c in data["metadata"]["categories"]}
+        self._tags_by_id = {t["id"]: t for t in data["metadata"]["tags"]}
+        self._tags_by_name = {t["name"]: t for t in data["metadata"]["tags"]}
+        self._lc_index = {}
+        self._gram_index = None
+        self._grams_by_prompt = {}
+        self._gram_stale = set()
+        self._max_usage_id = None
+        self._prompts_by_tag = None
+        self._prompts_by_category = None
+        self._rebuild_children()
+        self._reconcile_tags()
+
+    @staticmethod
+    def _remove_item(items, item):
+        """按对象身份从列表中原地删除元素（不做dict逐项相等比较，也不复制列表）"""
+        for index, existing in enumerate(items):
+            if existing is item:
+                del items[index]
+                return True
+        return False
+
+    @staticmethod
+    def _normalize_categories(categories):
+        """为旧版数据中的分类补充层级字段（parent_id、level、path），加载数据时执行一次"""
+        for category in categories:
+            category.setdefault("parent_id", None)
+            category.setdefault("level", 1)
+            category.setdefault("path", category["name"])
+
+    def _rebuild_children(self):
+        """重建分类的父子邻接表（分类新增、移动、删除后调用）"""
+        children = defaultdict(list)
+        for cat in self._state["metadata"]["categories"]:
+            children[cat.get("parent_id")].append(cat["id"])
+        self._children = children
+
+    @staticmethod
+    def _op_put(kind, obj):
+        """操作日志：新增或整体替换一个对象（kind为prompt/category/tag）"""
+        return {"op": "put", "kind": kind, "obj": obj}
+
+    @staticmethod
+    def _op_set(kind, obj_id, fields):
+        """操作日志：更新对象的部分字段（字段值为绝对值，重放幂等）"""
+        return {"op": "set", "kind": kind, "id": obj_id, "fields": fields}
+
+    @staticmethod
+    def _op_del(kind, obj_id):
+        """操作日志：删除一个对象"""
+        return {"op": "del", "kind": kind, "id": obj_id}
+
+    @staticmethod
+    def _op_reset(data):
+        """操作日志：用完整数据替换整个状态（清空、加载测试数据等整体替换）"""
+        return {"op": "reset", "data": data}
+
+    @staticmethod
+    def _op_add_version(prompt_id, version, fields):
+        """操作日志：为提示词追加一个版本并更新字段（只记录增量，不重写整个提示词）"""
+        return {"op": "add_version", "kind": "prompt", "id": prompt_id, "version": version, "fields": fields}
+
+    @staticmethod
+    def _op_del_version(prompt_id, version):
+        """操作日志：删除提示词的指定版本"""
+        return {"op": "del_version", "kind": "prompt", "id": prompt_id, "version": version}
+
+    def _tag_index(self):
+        """获取标签倒排索引（标签名 -> prompt_id集合），尚未构建时遍历一次提示词构建"""
+        if self._prompts_by_tag is None:
+            index = defaultdict(set)
+            for prompt in self._state["prompts"]:
+                for tag_name in prompt.get("tags") or ():
+                    index[tag_name].add(prompt["id"])
+            self._prompts_by_tag = index
+        return self._prompts_by_tag
+
+    def _reindex_prompt_tags(self, prompt_id, old_tags, new_tags):
+        """提示词标签变化后维护标签倒排索引（索引尚未构建时无需处理）"""
+        index = self._prompts_by_tag
+        if index is None:
+            return
+        for tag_name in old_tags or ():
+            ids = index.get(tag_name)
+            if ids is not None:
+                ids.discard(prompt_id)
+                if not ids:
+                    del index[tag_name]
+        for tag_name in new_tags or ():
+            index[tag_name].add(prompt_id)
+
+    @staticmethod
+    def _category_keys(prompt):
+        """提示词在分类倒排索引中的键（分类id、分类名、分类路径都可能被用来匹配）"""
+        return (("id", prompt.get("category_id")),
+                ("name", prompt.get("category")),
+                ("path", prompt.get("category_path")))
+
+    def _category_index(self):
+        """获取分类倒排索引（分类键 -> prompt_id集合），尚未构建时遍历一次提示词构建"""
+        if self._prompts_by_category is None:
+            index = defaultdict(set)
+            for prompt in self._state["prompts"]:
+                for key in self._category_keys(prompt):
+                    index[key].add(prompt["id"])
+            self._prompts_by_category = index
+        return self._prompts_by_category
+
+    def _reindex_prompt_category(self, prompt_id, old_keys, new_keys):
+        """提示词分类变化后维护分类倒排索引（索引尚未构建时无需处理）"""
+        index = self._prompts_by_category
+        if index is None or old_keys == new_keys:
+            return
+        for key in old_keys:
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(prompt_id)
+                if not ids:
+                    del index[key]
+        for key in new_keys:
+            index[key].add(prompt_id)
+
+    def _prompt_ids_in_category(self, *keys):
+        """返回匹配任一分类键的prompt_id集合"""
+        index = self._category_index()
+        matched = set()
+        for key in keys:
+            matched |= index.get(key, set())
+        return matched
+
+    def _register_tags(self, tag_names):
+        """为尚未定义的标签名创建默认定义，加入metadata和索引（不触发保存），返回新建的标签"""
+        new_tags = []
+        for tag_name in tag_names or ():
+            if tag_name in self._tags_by_name:
+                continue
+            tag_def = {
+                "id": f"auto-{new_id()[:8]}",
+                "name": tag_name,
+                "color": "#3B82F6"  # 默认蓝色
+            }
+            self._state["metadata"]["tags"].append(tag_def)
+            self._tags_by_id[tag_def["id"]] = tag_def
+            self._tags_by_name[tag_name] = tag_def
+            new_tags.append(tag_def)
+        return new_tags
+
+    def _unindex_tag_name(self, tag):
+        """
+        标签定义删除或改名后更新名称索引：标签名允许重复，若仍有同名定义则改为指向它
+        （与_rebuild_indexes一致，列表中靠后的定义优先），否则移除该名称
+        """
+        name = tag["name"]
+        if self._tags_by_name.get(name) is not tag:
+            return
+        for other in reversed(self._state["metadata"]["tags"]):
+            if other is not tag and other["name"] == name:
+                self._tags_by_name[name] = other
+                return
+        del self._tags_by_name[name]
+
+    def _index_tag_name(self, tag):
+        """将标签名指向该定义，已有同名定义且在列表中更靠后时保持不变（与_rebuild_indexes一致）"""
+        existing = self._tags_by_name.get(tag["name"])
+        if existing is not None and existing is not tag:
+            for other in reversed(self._state["metadata"]["tags"]):
+                if other is tag:
+                    break
+                if other is existing:
+                    return
+        self._tags_by_name[tag["name"]] = tag
+
+    def _reconcile_tags(self):
+        """
+        为旧数据中被提示词引用但未定义的标签补充默认定义（仅在加载状态时执行一次）
+
+        有新补充的定义时标记快照待写，由后台线程保存，否则每次重新加载都会生成新的id；
+        读取标签时不再做任何修改
+        """
+        if self._register_tags(self._tag_index()):
+            self._pending = True
+            if not self._batch_depth:
+                self._dirty.set()
+
+    @synchronized
+    def _save_data(self, data, now=None, ops=None):
+        """
+        保存统一数据，now为调用方已生成的时间戳
+
+        传入ops（本次修改对应的操作列表）时只追加操作日志；
+        否则（初始化、清空等整体替换）在日志中记录完整数据并标记快照待写，由后台线程重写数据文件。
+        快照写入前崩溃时，之后的操作会在这份完整数据之上重放，而不是重放到磁盘上的旧快照上
+        """
         # 更新最后修改时间
-        data["metadata"]["settings"]["last_updated"] = datetime.now().isoformat()
-        
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        now = now or datetime.now().isoformat()
+        data["metadata"]["settings"]["last_updated"] = now
+        self._revision += 1
+
+        if data is not self._state:
+            # 整体替换数据（初始化、清空等）时重建索引
+            self._set_state(data, self._state_key)
+
+        # 序列化必须在此刻完成，记录的是修改后的对象状态
+        lines = [json_dumps(dict(op, ts=now), indent=False) + b"\n"
+                 for op in (ops if ops is not None else [self._op_reset(data)])]
+        if self._batch_depth:
+            self._batch_ops.extend(lines)
+        else:
+            self._append_log(lines)
+        if ops is not None:
+            return
+
+        self._pending = True
+        if not self._batch_depth:
+            self._dirty.set()
+
+    def _append_log(self, lines):
+        """
+        追加操作日志（写入操作系统缓冲区后即返回，fsync由后台线程完成），
+        累积的操作过多时通知后台线程合并为快照
+        """
+        if not lines:
+            return
+        if self._wal is None:
+            self._wal = open(self.log_file, 'ab')
+        self._wal.write(b"".join(lines))
+        self._wal.flush()
+        self._log_unsynced.set()
+        self._ops_since_snapshot += len(lines)
+        if self._ops_since_snapshot >= self._compact_threshold:
+            self._dirty.set()
+
+    def _rotate_log(self):
+        """快照开始写入前切换日志文件（需持有锁），返回是否有旧日志待快照写入后删除"""
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+        self._ops_since_snapshot = 0
+        if not self.log_file.exists():
+            return self.old_log_file.exists()
+        if self.old_log_file.exists():
+            # 上次快照写入失败留下的旧日志，合并到一起
+            with open(self.old_log_file, 'ab') as f:
+                f.write(self.log_file.read_bytes())
+            self.log_file.unlink()
+        else:
+            os.replace(self.log_file, self.old_log_file)
+        return True
+
+    def _replay_ops(self, data):
+        """将操作日志（旧日志在前）重放到data上，返回重放的操作数（操作均为幂等）"""
+        def build_index():
+            lists = {
+                "prompt": data["prompts"],
+                "category": data["metadata"]["categories"],
+                "tag": data["metadata"]["tags"],
+            }
+            return lists, {kind: {item["id"]: item for item in items} for kind, items in lists.items()}
+
+        lists, index = build_index()
+        count = 0
+        for log_file in (self.old_log_file, self.log_file):
+            if not log_file.exists():
+                continue
+            for line in log_file.read_bytes().splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    op = json_loads(line)
+                except ValueError:
+                    # 崩溃时最后一行可能只写了一半，丢弃即可
+                    break
+                if isinstance(op, dict) and op.get("op") == "reset":
+                    # 整体替换：丢弃此前的状态，后续操作在新数据之上重放
+                    data.clear()
+                    data.update(op["data"])
+                    self._normalize_categories(data["metadata"]["categories"])
+                    lists, index = build_index()
+                    count += 1
+                    continue
+                if not isinstance(op, dict) or op.get("kind") not in lists:
+                    print(f"[WARN] 跳过无法识别的操作日志: {line[:100]!r}")
+                    continue
+                items, by_id = lists[op["kind"]], index[op["kind"]]
+                if op["op"] == "put":
+                    obj = op["obj"]
+                    existing = by_id.get(obj["id"])
+                    if existing is None:
+                        items.append(obj)
+                        by_id[obj["id"]] = obj
+                    else:
+                        existing.clear()
+                        existing.update(obj)
+                elif op["op"] == "set":
+                    existing = by_id.get(op["id"])
+                    if existing is not None:
+                        existing.update(op["fields"])
+                elif op["op"] == "del":
+                    existing = by_id.pop(op["id"], None)
+                    if existing is not None:
+                        self._remove_item(items, existing)
+                elif op["op"] == "add_version":
+                    existing = by_id.get(op["id"])
+                    if existing is not None:
+                        versions = existing.setdefault("versions", [])
+                        if op["version"] not in versions:
+                            versions.append(op["version"])
+                        existing.update(op["fields"])
+                elif op["op"] == "del_version":
+                    existing = by_id.get(op["id"])
+                    if existing is not None:
+                        existing["versions"] = [v for v in existing.get("versions", [])
+                                                if v["version"] != op["version"]]
+                data["metadata"]["settings"]["last_updated"] = op.get("ts", data["metadata"]["settings"].get("last_updated"))
+                count += 1
+        return count
+
+    @contextmanager
+    def batch(self):
+        """批量修改：期间持有锁，所有修改只作用于内存，退出时统一通知后台线程写盘一次"""
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    lines, self._batch_ops = self._batch_ops, []
+                    self._append_log(lines)
+                    if self._pending:
+                        self._dirty.set()
+
+    def _sync_loop(self):
+        """
+        后台日志同步线程：请求线程只把日志写入操作系统缓冲区，由这里统一fsync，
+        fsync期间到达的多次修改合并为一次fsync。进程崩溃不会丢失已写入缓冲区的日志，
+        只有断电等系统级故障可能丢失最近一次fsync之后的修改
+        """
+        while True:
+            self._log_unsynced.wait()
+            self._log_unsynced.clear()
+            with self._lock:
+                # 复制文件描述符，fsync时不持有锁，也不受快照期间关闭日志文件的影响
+                fd = os.dup(self._wal.fileno()) if self._wal is not None else None
+            if fd is None:
+                continue
+            try:
+                os.fsync(fd)
+            except OSError as e:
+                print(f"[ERROR] 操作日志同步失败: {e}")
+            finally:
+                os.close(fd)
+
+    def _flush_loop(self):
+        """后台写盘线程：等待修改通知，延迟片刻以合并连续修改后统一写入"""
+        while True:
+            self._dirty.wait()
+            time.sleep(self._flush_delay)
+            try:
+                self._flush_now()
+            except Exception as e:
+                print(f"[ERROR] 数据写入失败: {e}")
+
+    def _flush_now(self):
+        """
+        立即将内存状态写成快照（写临时文件并fsync后原子替换，崩溃时不会留下半截文件），
+        并合并掉已包含在快照中的操作日志
+        """
+        with self._write_lock:
+            with self._lock:
+                if not self._pending and not self._ops_since_snapshot:
+                    return
+                buf = json_dumps(self._state, indent=self.pretty)
+                self._pending = False
+                self._dirty.clear()
+                # 此后的新操作写入新日志；旧日志在快照落盘后才删除
+                has_old_log = self._rotate_log()
+
+            try:
+                self._write_file(self._compress(buf))
+            except Exception:
+                # 写入失败时保留待写标记和旧日志，下次修改或退出时重试
+                with self._lock:
+                    self._pending = True
+                raise
+
+            with self._lock:
+                self._state_key = self._file_key()
+            if has_old_log:
+                self.old_log_file.unlink(missing_ok=True)
+
+    def _compress(self, buf):
+        """按配置的格式压缩数据文件内容（最低压缩级别几乎不占CPU，JSON仍可压缩到原大小的几分之一）"""
+        if self.compress == "zstd":
+            return zstandard.ZstdCompressor(level=1).compress(buf)
+        if self.compress == "gzip":
+            return gzip.compress(buf, compresslevel=1)
+        return buf
+
+    def _decompress(self, raw):
+        """按配置的格式解压数据文件内容"""
+        return self._decompress_as(raw, self.compress)
+
+    @staticmethod
+    def _decompress_as(raw, compress):
+        """按指定的格式（None为未压缩）解压数据文件内容"""
+        if compress == "zstd":
+            try:
+                return zstandard.ZstdDecompressor().decompress(raw)
+            except zstandard.ZstdError as e:
+                # 与gzip格式错误一样按文件损坏处理
+                raise ValueError(str(e)) from e
+        if compress == "gzip":
+            return gzip.decompress(raw)
+        return raw
+
+    def _write_file(self, buf):
+        """写入数据文件：写临时文件并fsync后原子替换"""
+        tmp_file = self.data_file.with_name(self.data_file.name + ".tmp")
+        with open(tmp_file, 'wb') as f:
+            f.write(buf)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.data_file)
 
     def _migrate_from_old_format(self, old_data):
         """从旧格式迁移数据"""
@@ -123,23 +869,21 @@ class FileStorage:
         
         try:
             if (self.data_dir / "categories.json").exists():
-                with open(self.data_dir / "categories.json", 'r', encoding='utf-8') as f:
-                    old_cat_data = json.load(f)
-                    if isinstance(old_cat_data, list):
-                        old_categories = old_cat_data
-                    else:
-                        old_categories = old_cat_data.get('categories', [])
+                old_cat_data = json_loads((self.data_dir / "categories.json").read_bytes())
+                if isinstance(old_cat_data, list):
+                    old_categories = old_cat_data
+                else:
+                    old_categories = old_cat_data.get('categories', [])
         except:
             pass
             
         try:
             if (self.data_dir / "tags.json").exists():
-                with open(self.data_dir / "tags.json", 'r', encoding='utf-8') as f:
-                    old_tag_data = json.load(f)
-                    if isinstance(old_tag_data, list):
-                        old_tags = old_tag_data
-                    else:
-                        old_tags = old_tag_data.get('tags', [])
+                old_tag_data = json_loads((self.data_dir / "tags.json").read_bytes())
+                if isinstance(old_tag_data, list):
+                    old_tags = old_tag_data
+                else:
+                    old_tags = old_tag_data.get('tags', [])
         except:
             pass
 
@@ -147,15 +891,7 @@ class FileStorage:
         new_data = {
             "prompts": old_data.get("prompts", []),
             "metadata": {
-                "categories": old_categories if old_categories else [
-                    {"id": "1", "name": "编程", "color": "#3B82F6", "description": "编程相关提示词", "parent_id": None, "level": 1, "path": "编程"},
-                    {"id": "2", "name": "写作", "color": "#10B981", "description": "写作相关提示词", "parent_id": None, "level": 1, "path": "写作"},
-                    {"id": "3", "name": "分析", "color": "#F59E0B", "description": "分析相关提示词", "parent_id": None, "level": 1, "path": "分析"},
-                    {"id": "4", "name": "创意", "color": "#8B5CF6", "description": "创意相关提示词", "parent_id": None, "level": 1, "path": "创意"},
-                    {"id": "5", "name": "商业", "color": "#EF4444", "description": "商业相关提示词", "parent_id": None, "level": 1, "path": "商业"},
-                    {"id": "6", "name": "教育", "color": "#06B6D4", "description": "教育相关提示词", "parent_id": None, "level": 1, "path": "教育"},
-                    {"id": "7", "name": "其他", "color": "#6B7280", "description": "其他类型提示词", "parent_id": None, "level": 1, "path": "其他"}
-                ],
+                "categories": old_categories if old_categories else _default_categories(),
                 "tags": old_tags,
                 "settings": {
                     "last_updated": datetime.now().isoformat(),
@@ -176,7 +912,7 @@ class FileStorage:
         for tag_name in used_tags:
             if tag_name not in existing_tag_names:
                 new_data["metadata"]["tags"].append({
-                    "id": str(uuid.uuid4()),
+                    "id": new_id(),
                     "name": tag_name,
                     "color": "#3B82F6"  # 默认颜色
                 })
@@ -189,8 +925,113 @@ class FileStorage:
         data = self._load_data()
         return data["prompts"]
 
+    @synchronized
+    def get_prompt_by_id(self, prompt_id):
+        """按id获取提示词（通过id索引，O(1)）"""
+        self._load_data()
+        return self._prompts_by_id.get(prompt_id)
+
+    @synchronized
+    def get_category_prompt_counts(self):
+        """按(分类ID, 旧版分类名)统计提示词数量"""
+        data = self._load_data()
+        return Counter((p.get("category_id"), p.get("category")) for p in data["prompts"])
+
+    @synchronized
+    def get_most_used_prompt(self):
+        """获取使用次数最多的提示词（增量维护，只在最大者被删除等情况下重新扫描）"""
+        data = self._load_data()
+        if self._max_usage_id not in self._prompts_by_id:
+            prompts = data["prompts"]
+            self._max_usage_id = max(prompts, key=lambda p: p.get('usage_count', 0))["id"] if prompts else None
+        return self._prompts_by_id.get(self._max_usage_id)
+
+    @staticmethod
+    def _find_version(prompt, version):
+        """在提示词的版本列表中查找指定版本"""
+        return next((v for v in prompt.get("versions", []) if v["version"] == version), None)
+
+    @synchronized
+    def create_prompt_version(self, prompt_id, version_data):
+        """创建新版本并切换为当前版本"""
+        data = self._load_data()
+        prompt = self._prompts_by_id.get(prompt_id)
+        if not prompt:
+            return None
+
+        now = datetime.now().isoformat()
+        new_version = {
+            "version": version_data.get("version"),
+            "title": version_data.get("title"),
+            "content": version_data.get("content"),
+            "description": version_data.get("description", ""),
+            "created_at": now,
+            "change_note": version_data.get("change_note", "")
+        }
+        fields = {
+            "current_version": new_version["version"],
+            "title": new_version["title"],
+            "content": new_version["content"],
+            "description": new_version["description"],
+            "updated_at": now,
+        }
+        prompt.setdefault("versions", []).append(new_version)
+        prompt.update(fields)
+        self._invalidate_search(prompt_id)
+        self._save_data(data, now, [self._op_add_version(prompt_id, new_version, fields)])
+        return new_version
+
+    @synchronized
+    def switch_prompt_version(self, prompt_id, version):
+        """切换到指定版本"""
+        data = self._load_data()
+        prompt = self._prompts_by_id.get(prompt_id)
+        if not prompt:
+            return None
+
+        target_version = self._find_version(prompt, version)
+        if not target_version:
+            return None
+
+        now = datetime.now().isoformat()
+        fields = {
+            "current_version": version,
+            "title": target_version["title"],
+            "content": target_version["content"],
+            "description": target_version.get("description", ""),
+            "updated_at": now,
+        }
+        prompt.update(fields)
+        self._invalidate_search(prompt_id)
+        self._save_data(data, now, [self._op_set("prompt", prompt_id, fields)])
+        return prompt
+
+    @synchronized
+    def delete_prompt_version(self, prompt_id, version):
+        """删除指定版本"""
+        data = self._load_data()
+        prompt = self._prompts_by_id.get(prompt_id)
+        if not prompt:
+            return {"success": False, "error": "提示词不存在"}
+
+        versions = prompt.get("versions", [])
+        if len(versions) <= 1:
+            return {"success": False, "error": "不能删除唯一的版本"}
+        if prompt.get("current_version") == version:
+            return {"success": False, "error": "不能删除当前版本，请先切换到其他版本"}
+
+        if not self._find_version(prompt, version):
+            return {"success": False, "error": "版本不存在"}
+
+        # 与SQLite存储一致：删除该版本号的所有记录（重放时也保持幂等）
+        versions[:] = [v for v in versions if v["version"] != version]
+        self._save_data(data, ops=[self._op_del_version(prompt_id, version)])
+        return {"success": True}
+
+    @synchronized
     def create_prompt(self, prompt_data):
         data = self._load_data()
+        now = datetime.now().isoformat()
 
         # 获取分类信息
         category_id = prompt_data.get("category_id")
@@ -199,14 +1040,13 @@ class FileStorage:
 
         if category_id:
             # 根据category_id查找分类信息
-            categories_dict = {cat["id"]: cat for cat in data["metadata"]["categories"]}
-            category = categories_dict.get(category_id)
+            category = self._cats_by_id.get(category_id)
             if category:
                 category_name = category["name"]
                 category_path = category.get("path", category_name)
 
         new_prompt = {
-            "id": str(uuid.uuid4()),
+            "id": new_id(),
             "title": prompt_data["title"],
             "content": prompt_data["content"],
             "description": prompt_data.get("description", ""),
@@ -215,8 +1055,8 @@ class FileStorage:
             "category_path": category_path,
             "tags": prompt_data.get("tags", []),
             "usage_count": 0,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat(),
+            "created_at": now,
+            "updated_at": now,
             "current_version": "1.0",
             "versions": [
                 {
@@ -224,65 +1064,114 @@ class FileStorage:
                     "title": prompt_data["title"],
                     "content": prompt_data["content"],
                     "description": prompt_data.get("description", ""),
-                    "created_at": datetime.now().isoformat(),
+                    "created_at": now,
                     "change_note": "初始版本"
                 }
             ]
         }
 
         data["prompts"].append(new_prompt)
-        self._save_data(data)
+        self._prompts_by_id[new_prompt["id"]] = new_prompt
+        self._reindex_prompt_tags(new_prompt["id"], (), new_prompt["tags"])
+        self._reindex_prompt_category(new_prompt["id"], (), self._category_keys(new_prompt))
+        new_tags = self._register_tags(new_prompt["tags"])
+        ops = [self._op_put("tag", tag) for tag in new_tags]
+        ops.append(self._op_put("prompt", new_prompt))
+        self._save_data(data, now, ops)
         return new_prompt
 
+    def bulk_create_prompts(self, prompts_data):
+        """批量创建提示词（只触发一次写盘）"""
+        with self.batch():
+            return [self.create_prompt(prompt_data) for prompt_data in prompts_data]
+
+    @synchronized
     def update_prompt(self, prompt_id, update_data):
         data = self._load_data()
+        now = datetime.now().isoformat()
 
-        for prompt in data["prompts"]:
-            if prompt["id"] == prompt_id:
-                # 处理分类信息更新
-                if "category_id" in update_data:
-                    category_id = update_data["category_id"]
-                    if category_id:
-                        categories_dict = {cat["id"]: cat for cat in data["metadata"]["categories"]}
-                        category = categories_dict.get(category_id)
-                        if category:
-                            update_data["category"] = category["name"]
-                            update_data["category_path"] = category.get("path", category["name"])
-
-                prompt.update(update_data)
-                prompt["updated_at"] = datetime.now().isoformat()
-
-                # 确保有分类路径信息
-                if "category_path" not in prompt and "category" in prompt:
-                    prompt["category_path"] = prompt["category"]
-
-                self._save_data(data)
-                return prompt
-        return None
+        prompt = self._prompts_by_id.get(prompt_id)
+        if not prompt:
+            return None
 
+        # 处理分类信息更新
+        if "category_id" in update_data:
+            category_id = update_data["category_id"]
+            if category_id:
+                category = self._cats_by_id.get(category_id)
+                if category:
+                    update_data["category"] = category["name"]
+                    update_data["category_path"] = category.get("path", category["name"])
+
+        old_tags = prompt.get("tags")
+        old_category_keys = self._category_keys(prompt)
+        prompt.update(update_data)
+        prompt["updated_at"] = now
+        if "tags" in update_data:
+            self._reindex_prompt_tags(prompt_id, old_tags, prompt["tags"])
+        if "usage_count" in update_data:
+            self._max_usage_id = None
+        self._invalidate_search(prompt_id)
+        new_tags = self._register_tags(prompt["tags"]) if "tags" in update_data else []
+
+        # 确保有分类路径信息
+        if "category_path" not in prompt and "category" in prompt:
+            prompt["category_path"] = prompt["category"]
+        self._reindex_prompt_category(prompt_id, old_category_keys, self._category_keys(prompt))
+
+        ops = [self._op_put("tag", tag) for tag in new_tags]
+        ops.append(self._op_put("prompt", prompt))
+        self._save_data(data, now, ops)
+        return prompt
+
+    def bulk_update_prompts(self, updates):
+        """批量更新提示词（每项需包含id，只触发一次写盘），不存在的提示词对应结果为None"""
+        with self.batch():
+            results = []
+            for update_data in updates:
+                update_data = dict(update_data)
+                prompt_id = update_data.pop("id", None)
+                results.append(self.update_prompt(prompt_id, update_data) if prompt_id else None)
+            return results
+
+    @synchronized
     def delete_prompt(self, prompt_id):
         data = self._load_data()
-        
-        original_length = len(data["prompts"])
-        data["prompts"] = [p for p in data["prompts"] if p["id"] != prompt_id]
-        
-        if len(data["prompts"]) < original_length:
-            self._save_data(data)
-            return True
-        return False
 
+        prompt = self._prompts_by_id.pop(prompt_id, None)
+        if not prompt:
+            return False
+
+        self._remove_item(data["prompts"], prompt)
+        self._invalidate_search(prompt_id)
+        self._reindex_prompt_tags(prompt_id, prompt.get("tags"), ())
+        self._reindex_prompt_category(prompt_id, self._category_keys(prompt), ())
+        self._save_data(data, ops=[self._op_del("prompt", prompt_id)])
+        return True
+
+    @synchronized
     def use_prompt(self, prompt_id):
         data = self._load_data()
-        
-        for prompt in data["prompts"]:
-            if prompt["id"] == prompt_id:
-                prompt["usage_count"] = prompt.get("usage_count", 0) + 1
-                prompt["updated_at"] = datetime.now().isoformat()
-                self._save_data(data)
-                return prompt
-        return None
+        now = datetime.now().isoformat()
+
+        prompt = self._prompts_by_id.get(prompt_id)
+        if not prompt:
+            return None
+
+        prompt["usage_count"] = prompt.get("usage_count", 0) + 1
+        prompt["updated_at"] = now
+        top = self._prompts_by_id.get(self._max_usage_id)
+        if top is not None and prompt["usage_count"] > top.get("usage_count", 0):
+            self._max_usage_id = prompt_id
+        # 只记录变化的字段，避免每次点击都把整个提示词（含全部版本）写入日志
+        self._save_data(data, now, [self._op_set("prompt", prompt_id, {
+            "usage_count": prompt["usage_count"],
+            "updated_at": now,
+        })])
+        return prompt
 
     # 分类相关方法
+    @synchronized
     def get_all_categories(self):
         data = self._load_data()
         categories = data["metadata"]["categories"]
@@ -300,7 +1189,8 @@ class FileStorage:
 
     def get_categories_tree(self):
         """获取分类树结构"""
-        categories = self.get_all_categories()
+        # 复制一份再挂载children，避免污染缓存中的分类数据
+        categories = [dict(cat) for cat in self.get_all_categories()]
 
         # 构建分类字典，便于查找
         category_dict = {cat["id"]: cat for cat in categories}
@@ -321,45 +1211,69 @@ class FileStorage:
 
         return root_categories
 
-    def _build_category_path(self, category_id, categories_dict):
-        """构建分类的完整路径"""
-        if category_id not in categories_dict:
-            return ""
-
-        category = categories_dict[category_id]
-        if category["parent_id"] is None:
-            return category["name"]
-
-        parent_path = self._build_category_path(category["parent_id"], categories_dict)
-        return f"{parent_path}/{category['name']}" if parent_path else category["name"]
+    def _build_all_paths(self, categories_dict):
+        """一次性计算所有分类的完整路径：迭代向上查找祖先，已算出的路径直接复用"""
+        paths = {}
+        for category_id in categories_dict:
+            # 收集尚未计算路径的祖先链（自身在前）
+            chain = []
+            current = category_id
+            while current in categories_dict and current not in paths and current not in chain:
+                chain.append(current)
+                current = categories_dict[current]["parent_id"]
+
+            base = paths.get(current, "")
+            for cid in reversed(chain):
+                name = categories_dict[cid]["name"]
+                base = f"{base}/{name}" if base else name
+                paths[cid] = base
+        return paths
+
+    def _recompute_subtree_paths(self, root_id):
+        """只重新计算指定分类及其子树的路径（父分类路径视为已正确），返回路径被重算的分类"""
+        root = self._cats_by_id.get(root_id)
+        if root is None:
+            return []
+        parent = self._cats_by_id.get(root["parent_id"])
+        parent_path = parent.get("path", "") if parent else ""
+        visited = []
+        stack = [(root_id, parent_path)]
+        while stack:
+            cat_id, parent_path = stack.pop()
+            cat = self._cats_by_id[cat_id]
+            cat["path"] = f"{parent_path}/{cat['name']}" if parent_path else cat["name"]
+            visited.append(cat)
+            stack.extend((child_id, cat["path"]) for child_id in self._children.get(cat_id, ()))
+        return visited
 
     def _update_category_paths(self):
         """更新所有分类的路径"""
         data = self._load_data()
         categories = data["metadata"]["categories"]
-        categories_dict = {cat["id"]: cat for cat in categories}
+        paths = self._build_all_paths({cat["id"]: cat for cat in categories})
 
         for category in categories:
-            category["path"] = self._build_category_path(category["id"], categories_dict)
+            category["path"] = paths[category["id"]]
 
         self._save_data(data)
 
+    @synchronized
     def _get_category_descendants(self, category_id):
-        """获取分类的所有后代分类ID"""
-        data = self._load_data()
-        categories = data["metadata"]["categories"]
-
+        """获取分类的所有后代分类ID（基于邻接表迭代遍历，只访问子树）"""
+        self._load_data()
         descendants = []
-
-        def find_children(parent_id):
-            for cat in categories:
-                if cat["parent_id"] == parent_id:
-                    descendants.append(cat["id"])
-                    find_children(cat["id"])  # 递归查找子分类
-
-        find_children(category_id)
+        stack = [category_id]
+        while stack:
+            kids = self._children.get(stack.pop(), ())
+            descendants.extend(kids)
+            stack.extend(kids)
         return descendants
 
+    def get_category_descendants(self, category_id):
+        """获取分类的所有后代分类ID（公开方法）"""
+        return self._get_category_descendants(category_id)
+
+    @synchronized
     def create_category(self, category_data):
         data = self._load_data()
 
@@ -368,15 +1282,14 @@ class FileStorage:
 
         # 计算层级
         if parent_id:
-            categories_dict = {cat["id"]: cat for cat in data["metadata"]["categories"]}
-            parent = categories_dict.get(parent_id)
+            parent = self._cats_by_id.get(parent_id)
             if parent:
                 level = parent.get("level", 1) + 1
                 if level > 5:  # 最多支持5级
                     raise ValueError("分类层级不能超过5级")
 
         new_category = {
-            "id": str(uuid.uuid4()),
+            "id": new_id(),
             "name": category_data["name"],
             "color": category_data.get("color", "#6B7280"),
             "description": category_data.get("description", ""),
@@ -386,24 +1299,21 @@ class FileStorage:
         }
 
         data["metadata"]["categories"].append(new_category)
+        self._cats_by_id[new_category["id"]] = new_category
+        self._children[parent_id].append(new_category["id"])
 
-        # 重新计算所有分类的路径
-        categories_dict = {cat["id"]: cat for cat in data["metadata"]["categories"]}
-        for category in data["metadata"]["categories"]:
-            category["path"] = self._build_category_path(category["id"], categories_dict)
+        # 新分类没有子分类，只需计算它自己的路径
+        self._recompute_subtree_paths(new_category["id"])
 
-        self._save_data(data)
+        self._save_data(data, ops=[self._op_put("category", new_category)])
         return new_category
 
+    @synchronized
     def update_category(self, category_id, update_data):
         data = self._load_data()
+        now = datetime.now().isoformat()
 
-        target_category = None
-        for category in data["metadata"]["categories"]:
-            if category["id"] == category_id:
-                target_category = category
-                break
-
+        target_category = self._cats_by_id.get(category_id)
         if not target_category:
             return None
 
@@ -420,8 +1330,7 @@ class FileStorage:
 
             # 计算新的层级
             if new_parent_id:
-                categories_dict = {cat["id"]: cat for cat in data["metadata"]["categories"]}
-                parent = categories_dict.get(new_parent_id)
+                parent = self._cats_by_id.get(new_parent_id)
                 if parent:
                     new_level = parent.get("level", 1) + 1
                     if new_level > 5:
@@ -431,24 +1340,33 @@ class FileStorage:
                 target_category["level"] = 1
 
         # 更新分类信息
+        old_parent_id = target_category["parent_id"]
         target_category.update(update_data)
+        parent_changed = target_category["parent_id"] != old_parent_id
+        if parent_changed:
+            self._rebuild_children()
 
-        # 重新计算所有分类的路径（因为路径可能受到影响）
-        categories_dict = {cat["id"]: cat for cat in data["metadata"]["categories"]}
-        for category in data["metadata"]["categories"]:
-            category["path"] = self._build_category_path(category["id"], categories_dict)
+        # 名称或父分类变化只影响该分类及其子树的路径，仅修改颜色、描述时无需重算
+        changed_categories = [target_category]
+        if parent_changed or target_category["name"] != old_name:
+            changed_categories = self._recompute_subtree_paths(category_id)
+        ops = [self._op_put("category", cat) for cat in changed_categories]
 
         # 更新提示词中的分类信息
         new_path = target_category["path"]
         if old_path != new_path:
-            for prompt in data["prompts"]:
-                if prompt.get("category_path") == old_path or prompt.get("category") == old_name:
-                    prompt["category"] = target_category["name"]
-                    prompt["category_id"] = category_id
-                    prompt["category_path"] = new_path
-                    prompt["updated_at"] = datetime.now().isoformat()
-
-        self._save_data(data)
+            # 通过分类倒排索引只处理引用旧路径或旧名称的提示词
+            for prompt_id in self._prompt_ids_in_category(("path", old_path), ("name", old_name)):
+                prompt = self._prompts_by_id[prompt_id]
+                old_keys = self._category_keys(prompt)
+                prompt["category"] = target_category["name"]
+                prompt["category_id"] = category_id
+                prompt["category_path"] = new_path
+                prompt["updated_at"] = now
+                self._reindex_prompt_category(prompt_id, old_keys, self._category_keys(prompt))
+                ops.append(self._op_put("prompt", prompt))
+
+        self._save_data(data, now, ops)
         return target_category
 
     def _would_create_cycle(self, category_id, new_parent_id, categories):
@@ -457,41 +1375,24 @@ class FileStorage:
             return True
 
         # 获取所有后代分类
-        descendants = self._get_category_descendants_from_list(category_id, categories)
+        descendants = self._get_category_descendants(category_id)
         return new_parent_id in descendants
 
-    def _get_category_descendants_from_list(self, category_id, categories):
-        """从分类列表中获取指定分类的所有后代分类ID"""
-        descendants = []
-
-        def find_children(parent_id):
-            for cat in categories:
-                if cat["parent_id"] == parent_id:
-                    descendants.append(cat["id"])
-                    find_children(cat["id"])
-
-        find_children(category_id)
-        return descendants
-
+    @synchronized
     def delete_category(self, category_id):
-        data = self._load_data()
+        self._load_data()
 
         # 找到要删除的分类
-        category_to_delete = None
-        for category in data["metadata"]["categories"]:
-            if category["id"] == category_id:
-                category_to_delete = category
-                break
-
+        category_to_delete = self._cats_by_id.get(category_id)
         if not category_to_delete:
             return {"success": False, "error": "分类不存在"}
 
-        # 检查是否有子分类
-        child_categories = [cat for cat in data["metadata"]["categories"] if cat["parent_id"] == category_id]
+        # 检查是否有子分类（通过父子邻接表，无需扫描全部分类）
+        child_categories = [self._cats_by_id[cid] for cid in self._children.get(category_id, ())]
 
-        # 检查关联的提示词
-        affected_prompts = [p for p in data["prompts"]
-                          if p.get("category_id") == category_id or p.get("category") == category_to_delete["name"]]
+        # 统计关联的提示词（只计数，不构造中间列表）
+        category_name = category_to_delete["name"]
+        affected_prompts_count = len(self._prompt_ids_in_category(("id", category_id), ("name", category_name)))
 
         # 返回删除影响信息，让前端决定是否继续
         return {
@@ -499,27 +1400,24 @@ class FileStorage:
             "requires_confirmation": True,
             "category_name": category_to_delete["name"],
             "child_categories_count": len(child_categories),
-            "affected_prompts_count": len(affected_prompts),
+            "affected_prompts_count": affected_prompts_count,
             "child_categories": [cat["name"] for cat in child_categories]
         }
 
+    @synchronized
     def force_delete_category(self, category_id):
         """强制删除分类（已确认）"""
         data = self._load_data()
+        now = datetime.now().isoformat()
 
         # 找到要删除的分类
-        category_to_delete = None
-        for category in data["metadata"]["categories"]:
-            if category["id"] == category_id:
-                category_to_delete = category
-                break
-
+        category_to_delete = self._cats_by_id.get(category_id)
         if not category_to_delete:
             return {"success": False, "error": "分类不存在"}
 
         # 获取所有子分类（包括递归的）
         all_descendants = self._get_category_descendants(category_id)
-        categories_to_delete = [category_id] + all_descendants
+        categories_to_delete = set([category_id] + all_descendants)
 
         # 移动关联的提示词到"其他"分类
         other_category = None
@@ -529,29 +1427,36 @@ class FileStorage:
                 break
 
         affected_prompts_count = 0
-        for prompt in data["prompts"]:
-            if (prompt.get("category_id") in categories_to_delete or
-                prompt.get("category") == category_to_delete["name"]):
-                if other_category:
-                    prompt["category"] = other_category["name"]
-                    prompt["category_id"] = other_category["id"]
-                    prompt["category_path"] = other_category["path"]
-                else:
-                    prompt["category"] = "其他"
-                    prompt["category_id"] = None
-                    prompt["category_path"] = "其他"
-                prompt["updated_at"] = datetime.now().isoformat()
-                affected_prompts_count += 1
-
-        # 删除分类及其所有子分类
-        original_length = len(data["metadata"]["categories"])
-        data["metadata"]["categories"] = [c for c in data["metadata"]["categories"]
-                                        if c["id"] not in categories_to_delete]
-
-        deleted_count = original_length - len(data["metadata"]["categories"])
+        ops = []
+        affected_ids = self._prompt_ids_in_category(("name", category_to_delete["name"]),
+                                                    *(("id", cid) for cid in categories_to_delete))
+        for prompt_id in affected_ids:
+            prompt = self._prompts_by_id[prompt_id]
+            old_keys = self._category_keys(prompt)
+            if other_category:
+                prompt["category"] = other_category["name"]
+                prompt["category_id"] = other_category["id"]
+                prompt["category_path"] = other_category["path"]
+            else:
+                prompt["category"] = "其他"
+                prompt["category_id"] = None
+                prompt["category_path"] = "其他"
+            prompt["updated_at"] = now
+            affected_prompts_count += 1
+            self._reindex_prompt_category(prompt_id, old_keys, self._category_keys(prompt))
+            ops.append(self._op_put("prompt", prompt))
+
+        # 删除分类及其所有子分类（原地删除，不复制整个列表）
+        deleted_count = 0
+        for cid in categories_to_delete:
+            category = self._cats_by_id.pop(cid, None)
+            if category is not None and self._remove_item(data["metadata"]["categories"], category):
+                deleted_count += 1
+                ops.append(self._op_del("category", cid))
+        self._rebuild_children()
 
         if deleted_count > 0:
-            self._save_data(data)
+            self._save_data(data, now, ops)
             return {
                 "success": True,
                 "deleted_categories_count": deleted_count,
@@ -560,118 +1465,181 @@ class FileStorage:
         return {"success": False, "error": "删除失败"}
 
     # 标签相关方法
+    @synchronized
     def get_all_tags(self):
-        data = self._load_data()
-        
-        # 从prompts中提取实际使用的标签
-        used_tags = set()
-        for prompt in data["prompts"]:
-            if prompt.get("tags"):
-                used_tags.update(prompt["tags"])
-        
-        # 获取metadata中的标签定义
-        metadata_tags = {tag["name"]: tag for tag in data["metadata"]["tags"]}
-        
-        # 合并：确保所有使用的标签都有定义
-        result_tags = []
-        for tag_name in used_tags:
-            if tag_name in metadata_tags:
-                # 使用metadata中的定义
-                result_tags.append(metadata_tags[tag_name])
-            else:
-                # 为没有定义的标签创建默认定义
-                import uuid
-                tag_def = {
-                    "id": f"auto-{str(uuid.uuid4())[:8]}",
-                    "name": tag_name,
-                    "color": "#3B82F6"  # 默认蓝色
-                }
-                result_tags.append(tag_def)
-                # 同时添加到metadata中
-                data["metadata"]["tags"].append(tag_def)
-        
-        # 如果有新标签添加到metadata，保存数据
-        if len(result_tags) > len(metadata_tags):
-            self._save_data(data)
-        
-        return result_tags
+        """获取所有被提示词使用的标签（纯读取，不修改数据）"""
+        self._load_data()
+        # 未定义的标签已在加载时补齐，新增/更新提示词时也会即时注册
+        return [self._tags_by_name[tag_name] for tag_name, ids in self._tag_index().items() if ids]
 
+    @synchronized
     def create_tag(self, tag_data):
         data = self._load_data()
         
         new_tag = {
-            "id": str(uuid.uuid4()),
+            "id": new_id(),
             "name": tag_data["name"],
             "color": tag_data.get("color", "#3B82F6")
         }
         
         data["metadata"]["tags"].append(new_tag)
-        self._save_data(data)
+        self._tags_by_id[new_tag["id"]] = new_tag
+        self._tags_by_name[new_tag["name"]] = new_tag
+        self._save_data(data, ops=[self._op_put("tag", new_tag)])
         return new_tag
 
+    @synchronized
     def update_tag(self, tag_id, update_data):
         data = self._load_data()
+        now = datetime.now().isoformat()
         
-        for tag in data["metadata"]["tags"]:
-            if tag["id"] == tag_id:
-                old_name = tag["name"]
-                tag.update(update_data)
-                
-                # 如果标签名称发生变化，更新所有使用该标签的提示词
-                if "name" in update_data and update_data["name"] != old_name:
-                    for prompt in data["prompts"]:
-                        if prompt.get("tags") and old_name in prompt["tags"]:
-                            prompt["tags"] = [update_data["name"] if t == old_name else t for t in prompt["tags"]]
-                            prompt["updated_at"] = datetime.now().isoformat()
-                
-                self._save_data(data)
-                return tag
-        return None
+        tag = self._tags_by_id.get(tag_id)
+        if not tag:
+            return None
 
+        old_name = tag["name"]
+        if "name" in update_data and update_data["name"] != old_name:
+            self._unindex_tag_name(tag)
+        tag.update(update_data)
+        ops = [self._op_put("tag", tag)]
+
+        # 如果标签名称发生变化，更新所有使用该标签的提示词
+        if "name" in update_data and update_data["name"] != old_name:
+            self._index_tag_name(tag)
+            # 通过标签倒排索引只处理使用该标签的提示词
+            index = self._tag_index()
+            prompt_ids = index.pop(old_name, set())
+            for prompt_id in prompt_ids:
+                prompt = self._prompts_by_id[prompt_id]
+                prompt["tags"] = [update_data["name"] if t == old_name else t for t in prompt["tags"]]
+                prompt["updated_at"] = now
+                ops.append(self._op_put("prompt", prompt))
+            if prompt_ids:
+                index[update_data["name"]] |= prompt_ids
+
+        self._save_data(data, now, ops)
+        return tag
+
+    @synchronized
     def delete_tag(self, tag_id):
         data = self._load_data()
+        now = datetime.now().isoformat()
         
         # 找到要删除的标签
-        tag_to_delete = None
-        for tag in data["metadata"]["tags"]:
-            if tag["id"] == tag_id:
-                tag_to_delete = tag["name"]
-                break
-        
-        if not tag_to_delete:
+        tag = self._tags_by_id.pop(tag_id, None)
+        if not tag:
             return False
+        tag_to_delete = tag["name"]
+        self._unindex_tag_name(tag)
         
         # 处理关联的提示词：从所有提示词中移除该标签
-        affected_count = 0
-        for prompt in data["prompts"]:
-            if prompt.get("tags") and tag_to_delete in prompt["tags"]:
-                prompt["tags"] = [tag for tag in prompt["tags"] if tag != tag_to_delete]
-                prompt["updated_at"] = datetime.now().isoformat()
-                affected_count += 1
+        prompt_ids = self._tag_index().pop(tag_to_delete, set())
+        affected_count = len(prompt_ids)
+        ops = []
+        for prompt_id in prompt_ids:
+            prompt = self._prompts_by_id[prompt_id]
+            prompt["tags"] = [t for t in prompt["tags"] if t != tag_to_delete]
+            prompt["updated_at"] = now
+            ops.append(self._op_put("prompt", prompt))
         
         # 删除标签
-        original_length = len(data["metadata"]["tags"])
-        data["metadata"]["tags"] = [t for t in data["metadata"]["tags"] if t["id"] != tag_id]
-        
-        if len(data["metadata"]["tags"]) < original_length:
-            self._save_data(data)
+        if self._remove_item(data["metadata"]["tags"], tag):
+            ops.append(self._op_del("tag", tag_id))
+            self._save_data(data, now, ops)
             return {"success": True, "affected_prompts": affected_count}
         return False
 
-    def search_prompts(self, query: str = "", category: str = "", category_id: str = ""):
+    def _search_text(self, prompt):
+        """
+        获取提示词标题、内容、描述拼接后的小写文本（按id缓存，提示词修改时失效），
+        字段间以\0分隔，搜索时一次子串查找即可覆盖三个字段，且不会跨字段匹配
+        """
+        text = self._lc_index.get(prompt["id"])
+        if text is None:
+            text = "\0".join((prompt['title'], prompt['content'], prompt.get('description', ''))).lower()
+            self._lc_index[prompt["id"]] = text
+        return text
+
+    def _invalidate_search(self, prompt_id):
+        """提示词文本变化或被删除后，使其搜索缓存失效"""
+        self._lc_index.pop(prompt_id, None)
+        if self._gram_index is not None:
+            self._gram_stale.add(prompt_id)
+
+    @staticmethod
+    def _trigrams(text):
+        """文本中所有长度为3的子串"""
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def _sync_gram_index(self):
+        """构建三字组倒排索引，或只为内容变化过的提示词重新索引"""
+        if self._gram_index is None:
+            self._gram_index = defaultdict(set)
+            self._grams_by_prompt = {}
+            self._gram_stale = set(self._prompts_by_id)
+
+        for prompt_id in self._gram_stale:
+            for gram in self._grams_by_prompt.pop(prompt_id, ()):
+                ids = self._gram_index[gram]
+                ids.discard(prompt_id)
+                if not ids:
+                    del self._gram_index[gram]
+            prompt = self._prompts_by_id.get(prompt_id)
+            if prompt is None:
+                continue
+            # 跨字段的三字组含\0，查询中不会出现，不影响结果
+            grams = self._trigrams(self._search_text(prompt))
+            self._grams_by_prompt[prompt_id] = grams
+            for gram in grams:
+                self._gram_index[gram].add(prompt_id)
+        self._gram_stale = set()
+
+    def _search_candidates(self, query):
+        """通过倒排索引求可能包含query（已小写，长度至少为3）的提示词id集合"""
+        self._sync_gram_index()
+        postings = []
+        for gram in self._trigrams(query):
+            ids = self._gram_index.get(gram)
+            if not ids:
+                # 任一三字组没有出现在任何提示词中，不可能匹配
+                return set()
+            postings.append(ids)
+        # 从最小的倒排列表开始求交集
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            candidates &= ids
+            if not candidates:
+                break
+        return candidates
+
+    @synchronized
+    def search_prompts(self, query: str = "", category: str = "", category_id: str = "", tags=()):
         prompts = self.get_all_prompts()
 
+        if tags:
+            # 通过标签倒排索引求包含任一标签的提示词（保持原有顺序）
+            index = self._tag_index()
+            tagged_ids = set().union(*(index.get(tag_name, ()) for tag_name in tags))
+            prompts = [p for p in prompts if p["id"] in tagged_ids]
+
         if query:
             query = query.lower()
-            prompts = [p for p in prompts if
-                      query in p['title'].lower() or
-                      query in p['content'].lower() or
-                      query in p.get('description', '').lower()]
+            if self.search_index and len(query) >= 3:
+                # 先用倒排索引缩小范围（保持原有顺序），再确认子串确实存在
+                candidates = self._search_candidates(query)
+                prompts = [p for p in prompts if p["id"] in candidates]
+            if "\0" in query:
+                # 分隔符不可能出现在任何单个字段中
+                prompts = []
+            else:
+                search_text = self._search_text
+                prompts = [p for p in prompts if query in search_text(p)]
 
         if category_id:
             # 按分类ID搜索，包括其子分类
             descendants = self._get_category_descendants(category_id)
-            target_category_ids = [category_id] + descendants
+            target_category_ids = {category_id, *descendants}
             prompts = [p for p in prompts if p.get('category_id') in target_category_ids]
         elif category:
             # 按分类名称搜索（向后兼容）
@@ -680,17 +1648,32 @@ class FileStorage:
         return prompts
 
     # 数据管理方法
+    @synchronized
     def backup_data(self):
-        """备份数据"""
+        """
+        备份数据：在锁内序列化当前内存状态（包含尚未落盘的修改），
+        压缩和写文件交给后台线程，立即返回备份文件路径
+        """
+        buf = json_dumps(self._load_data(), indent=self.pretty)
+
         backup_dir = self.data_dir / "backup"
         backup_dir.mkdir(exist_ok=True)
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = backup_dir / f"backup_{timestamp}.json"
+        suffix = "".join(self.data_file.suffixes)
+        backup_file = backup_dir / f"backup_{timestamp}{suffix}"
         
-        shutil.copy2(self.data_file, backup_file)
+        self._backup_executor.submit(self._write_backup, backup_file, buf)
         return str(backup_file)
 
+    def _write_backup(self, backup_file, buf):
+        """后台线程：压缩并写入备份文件"""
+        try:
+            backup_file.write_bytes(self._compress(buf))
+        except Exception as e:
+            print(f"[ERROR] 备份写入失败: {e}")
+
+    @synchronized
     def clear_all_data(self):
         """清空所有数据，但保留默认分类"""
         backup_file = self.backup_data()
@@ -698,15 +1681,7 @@ class FileStorage:
         default_data = {
             "prompts": [],
             "metadata": {
-                "categories": [
-                    {"id": "1", "name": "编程", "color": "#3B82F6", "description": "编程相关提示词", "parent_id": None, "level": 1, "path": "编程"},
-                    {"id": "2", "name": "写作", "color": "#10B981", "description": "写作相关提示词", "parent_id": None, "level": 1, "path": "写作"},
-                    {"id": "3", "name": "分析", "color": "#F59E0B", "description": "分析相关提示词", "parent_id": None, "level": 1, "path": "分析"},
-                    {"id": "4", "name": "创意", "color": "#8B5CF6", "description": "创意相关提示词", "parent_id": None, "level": 1, "path": "创意"},
-                    {"id": "5", "name": "商业", "color": "#EF4444", "description": "商业相关提示词", "parent_id": None, "level": 1, "path": "商业"},
-                    {"id": "6", "name": "教育", "color": "#06B6D4", "description": "教育相关提示词", "parent_id": None, "level": 1, "path": "教育"},
-                    {"id": "7", "name": "其他", "color": "#6B7280", "description": "其他类型提示词", "parent_id": None, "level": 1, "path": "其他"}
-                ],
+                "categories": _default_categories(),
                 "tags": [],
                 "settings": {
                     "last_updated": datetime.now().isoformat(),
@@ -718,6 +1693,18 @@ class FileStorage:
         self._save_data(default_data)
         return backup_file
 
+    def _read_example_file(self, path):
+        """
+        读取示例数据文件的原始内容，按(mtime_ns, size)缓存，文件未变化时直接复用；
+        解析结果会成为可修改的内存状态，因此每次都从bytes重新解析而不缓存解析后的对象
+        """
+        st = path.stat()
+        key = (st.st_mtime_ns, st.st_size)
+        if self._example_cache is None or self._example_cache[0] != key:
+            self._example_cache = (key, path.read_bytes())
+        return self._example_cache[1]
+
+    @synchronized
     def load_test_data(self):
         """加载测试数据"""
         backup_file = self.backup_data()
@@ -727,9 +1714,8 @@ class FileStorage:
             example_prompts_file = examples_dir / "prompts.json"
             
             if example_prompts_file.exists():
-                with open(example_prompts_file, 'r', encoding='utf-8') as f:
-                    example_data = json.load(f)
-                    
+                example_data = json_loads(self._read_example_file(example_prompts_file))
+
                 # 加载测试数据，但保持当前的metadata结构
                 current_data = self._load_data()
                 current_data["prompts"] = example_data.get("prompts", [])
@@ -744,11 +1730,12 @@ class FileStorage:
                 for tag_name in used_tags:
                     if tag_name not in existing_tag_names:
                         current_data["metadata"]["tags"].append({
-                            "id": str(uuid.uuid4()),
+                            "id": new_id(),
                             "name": tag_name,
                             "color": "#3B82F6"
                         })
-                
+
+                self._rebuild_indexes()
                 self._save_data(current_data)
                 return backup_file
             else:
@@ -758,23 +1745,161 @@ class FileStorage:
             # 加载测试数据失败
             raise
 
-# 初始化存储
-# 检查是否需要从JSON迁移到SQLite
-if check_migration_needed("data/prompts.json", "data/prompthub.db"):
-    print("检测到JSON数据，正在迁移到SQLite数据库...")
-    try:
-        migrate_from_json("data/prompts.json", "data/prompthub.db", "database/schema.sql")
+# 存储实例，由init_app()初始化（避免在导入模块时就执行迁移和建库）
+storage = None
+
+@contextmanager
+def interprocess_lock(path):
+    """跨进程互斥锁（阻塞等待），不支持fcntl的平台上不加锁"""
+    if fcntl is None:
+        yield
+        return
+    Path(path).parent.mkdir(exist_ok=True)
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def prepare_storage():
+    """
+    确定存储后端，需要时执行JSON到SQLite的迁移。
+    多个worker进程同时启动时通过文件锁保证只有一个进程执行迁移，其余进程等待后直接使用迁移结果
+
+    Returns:
+        str: "sqlite"，或迁移失败只能继续使用JSON文件存储时为"file"
+    """
+    with interprocess_lock("data/.migrate.lock"):
+        if not check_migration_needed("data/prompts.json", "data/prompthub.db"):
+            return "sqlite"
+        print("检测到JSON数据，正在迁移到SQLite数据库...")
+        try:
+            migrate_from_json("data/prompts.json", "data/prompthub.db", "database/schema.sql")
+        except Exception as e:
+            print(f"数据迁移失败: {e}")
+            return "file"
         print("数据迁移完成")
-    except Exception as e:
-        print(f"数据迁移失败: {e}")
-        # 如果迁移失败，继续使用JSON存储
-        storage = FileStorage()
-    else:
-        # 迁移成功，使用SQLite存储
-        storage = SQLiteStorage()
-else:
-    # 不需要迁移，直接使用SQLite存储
-    storage = SQLiteStorage()
+        return "sqlite"
+
+def init_storage():
+    """初始化存储：检查是否需要从JSON迁移到SQLite"""
+    if prepare_storage() == "file":
+        # 如果迁移失败，继续使用JSON存储（debug模式下保留缩进格式便于查看）
+        config = load_config()
+        return FileStorage(pretty=config.get('debug', False),
+                           compress=config.get('compress_data', False),
+                           search_index=config.get('search_index', False))
+    # 不需要迁移或迁移成功，使用SQLite存储
+    return SQLiteStorage()
+
+def init_compression(flask_app):
+    """启用响应压缩（gzip等），仅压缩超过1KB的响应，避免小响应白白消耗CPU"""
+    if Compress is None or 'compress' in flask_app.extensions:
+        return
+    flask_app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    Compress(flask_app)
+
+_STORAGE_LOCK = threading.Lock()
+
+def ensure_storage():
+    """初始化存储（只执行一次；多个线程同时调用时只有一个线程执行初始化）"""
+    global storage
+    if storage is None:
+        with _STORAGE_LOCK:
+            if storage is None:
+                storage = init_storage()
+    return storage
+
+def init_app(flask_app):
+    """加载配置并初始化存储（重复调用时不会重复初始化）"""
+    load_config()
+    init_compression(flask_app)
+    ensure_storage()
+    return flask_app
+
+def create_app():
+    """
+    应用工厂，供gunicorn等WSGI服务器使用：
+    gunicorn -k gthread -w 4 --threads 8 'app:create_app()'
+
+    未使用--preload时工厂在每个worker进程fork之后调用，
+    存储（包括FileStorage的内存数据）在worker启动时加载一次，而不是每个请求加载
+    """
+    return init_app(app)
+
+# 响应压缩在导入时注册（Flask不允许在处理首个请求后再注册钩子）
+init_compression(app)
+
+@app.before_request
+def _ensure_storage():
+    """未经init_app/create_app启动时（如flask run或app:app），在首个请求前初始化存储"""
+    ensure_storage()
+
+class RevisionCache:
+    """按存储数据版本号缓存计算结果：版本号变化时整体失效，最多保留maxsize项"""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._revision = None
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """返回key对应的缓存结果，不存在时调用compute()计算并缓存"""
+        # 先取版本号再计算，结果至少与该版本号一样新，不会把旧数据缓存到新版本下
+        revision = storage.revision
+        with self._lock:
+            if revision != self._revision:
+                self._items.clear()
+                self._revision = revision
+            elif key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+
+        value = compute()
+        with self._lock:
+            if revision == self._revision:
+                self._items[key] = value
+                if len(self._items) > self.maxsize:
+                    self._items.popitem(last=False)
+        return value
+
+def revision_etag(view):
+    """
+    为只读GET接口添加ETag：由请求路径和存储数据版本号生成，无需序列化响应即可判断是否变化。
+    客户端携带匹配的If-None-Match时直接返回304
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = f"{request.full_path}|{storage.revision}".encode()
+        etag = hashlib.blake2b(key, digest_size=16).hexdigest()
+        if request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag, weak=True)
+        # 允许浏览器缓存，但每次使用前都要向服务器确认
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
+
+# 分类、标签、统计等数据读多写少，按数据版本号缓存，修改后自动失效
+_metadata_cache = RevisionCache(maxsize=8)
+
+def cached_categories():
+    """获取所有分类（缓存）"""
+    return _metadata_cache.get('categories', storage.get_all_categories)
+
+def cached_categories_tree():
+    """获取分类树（缓存）"""
+    return _metadata_cache.get('categories_tree', storage.get_categories_tree)
+
+def cached_tags():
+    """获取所有标签（缓存）"""
+    return _metadata_cache.get('tags', storage.get_all_tags)
 
 # API 路由保持不变，但实现逻辑更新
 @app.route('/')
@@ -784,52 +1909,140 @@ def index():
 
 @app.route('/api/prompts', methods=['GET'])
 def get_prompts():
-    return jsonify(storage.get_all_prompts())
+    # 先复制列表（只复制引用），流式输出期间其它请求增删提示词不会导致遗漏或重复
+    prompts = list(storage.get_all_prompts())
+    return Response(stream_json_array(prompts), mimetype='application/json')
+
+def prompt_data_from_body(body):
+    """从请求体中提取创建提示词所需的字段"""
+    # 将空字符串转换为None，避免外键约束错误
+    category_id = body.get('category_id')
+    if category_id == '':
+        category_id = None
+
+    return {
+        "title": body.get('title'),
+        "content": body.get('content'),
+        "description": body.get('description', ''),
+        "category": body.get('category', '其他'),
+        "category_id": category_id,
+        "tags": body.get('tags', [])
+    }
+
+def pick_fields(body, fields, nullable=()):
+    """
+    按字段列表从请求体中一次性提取更新数据
+
+    Args:
+        body: 请求体字典
+        fields: 字段名列表，值为None或未出现时忽略
+        nullable: 允许置空的字段名列表，只要在请求体中出现就保留（包括None）
+
+    Returns:
+        dict: 更新数据
+    """
+    update_data = {key: body[key] for key in fields if body.get(key) is not None}
+    update_data.update((key, body[key]) for key in nullable if key in body)
+    return update_data
+
+def prompt_update_from_body(body):
+    """从请求体中提取更新提示词的字段（只包含请求中出现的字段）"""
+    update_data = pick_fields(body, ('title', 'content', 'description', 'tags'), nullable=('category_id',))
+    if update_data.get('category_id') == '':
+        # 将空字符串转换为None，避免外键约束错误
+        update_data['category_id'] = None
+    return update_data
+
+def validate_prompt_item(item, creating):
+    """
+    检查批量接口中单个提示词对象的字段，返回错误信息，没有问题时返回None
+
+    Args:
+        item: 提示词对象
+        creating: 是否为新建（新建时标题和内容必填）
+    """
+    for key in ('title', 'content'):
+        value = item.get(key)
+        if value is None and not creating:
+            continue
+        if not isinstance(value, str) or not value:
+            return f"{key}必须是非空字符串"
+    description = item.get('description')
+    if description is not None and not isinstance(description, str):
+        return "description必须是字符串"
+    tags = item.get('tags')
+    if tags is not None and (not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags)):
+        return "tags必须是字符串数组"
+    return None
+
+def find_invalid_item(items, creating):
+    """返回第一个不合法的提示词对象的错误响应（整批不执行），全部合法时返回None"""
+    for index, item in enumerate(items):
+        error = validate_prompt_item(item, creating)
+        if error:
+            return jsonify({"error": f"第{index + 1}项：{error}", "index": index}), 400
+    return None
+
+def get_json_list():
+    """解析请求体中的JSON数组，格式不正确时返回None"""
+    raw = request.get_data(cache=True)
+    items = json_loads(raw) if raw else None
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return None
+    return items
 
 @app.route('/api/prompts', methods=['POST'])
 def create_prompt():
     """创建提示词"""
     try:
-        # 将空字符串转换为None，避免外键约束错误
-        category_id = request.json.get('category_id')
-        if category_id == '':
-            category_id = None
-
-        prompt_data = {
-            "title": request.json.get('title'),
-            "content": request.json.get('content'),
-            "description": request.json.get('description', ''),
-            "category": request.json.get('category', '其他'),
-            "category_id": category_id,
-            "tags": request.json.get('tags', [])
-        }
-
-        new_prompt = storage.create_prompt(prompt_data)
+        body = get_json_body()
+        new_prompt = storage.create_prompt(prompt_data_from_body(body))
         return jsonify(new_prompt), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/prompts/bulk', methods=['POST'])
+def bulk_create_prompts():
+    """批量创建提示词，请求体为提示词对象数组"""
+    try:
+        items = get_json_list()
+        if items is None:
+            return jsonify({"error": "请求体必须是提示词对象数组"}), 400
+        invalid = find_invalid_item(items, creating=True)
+        if invalid:
+            return invalid
+
+        new_prompts = storage.bulk_create_prompts([prompt_data_from_body(item) for item in items])
+        return jsonify(new_prompts), 201
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/prompts/bulk', methods=['PUT'])
+def bulk_update_prompts():
+    """批量更新提示词，请求体为包含id的提示词对象数组，不存在的提示词结果为null"""
+    try:
+        items = get_json_list()
+        if items is None or not all(item.get('id') for item in items):
+            return jsonify({"error": "请求体必须是包含id的提示词对象数组"}), 400
+        invalid = find_invalid_item(items, creating=False)
+        if invalid:
+            return invalid
+
+        updates = [dict(prompt_update_from_body(item), id=item['id']) for item in items]
+        return jsonify(storage.bulk_update_prompts(updates))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/prompts/<prompt_id>', methods=['PUT'])
 def update_prompt(prompt_id):
     """更新提示词"""
     try:
+        body = get_json_body()
         # 打印请求数据用于调试
         print(f"[DEBUG] 更新提示词 {prompt_id}")
-        print(f"[DEBUG] 请求数据: {request.json}")
-
-        update_data = {}
-        if request.json.get('title') is not None:
-            update_data["title"] = request.json.get('title')
-        if request.json.get('content') is not None:
-            update_data["content"] = request.json.get('content')
-        if request.json.get('description') is not None:
-            update_data["description"] = request.json.get('description')
-        if 'category_id' in request.json:
-            # 将空字符串转换为None，避免外键约束错误
-            category_id = request.json.get('category_id')
-            update_data["category_id"] = None if category_id == '' else category_id
-        if request.json.get('tags') is not None:
-            update_data["tags"] = request.json.get('tags')
+        print(f"[DEBUG] 请求数据: {body}")
+
+        update_data = prompt_update_from_body(body)
 
         print(f"[DEBUG] 处理后的数据: {update_data}")
 
@@ -839,7 +2052,6 @@ def update_prompt(prompt_id):
         else:
             return jsonify({"error": "提示词不存在"}), 404
     except Exception as e:
-        import traceback
         print(f"[ERROR] 更新提示词失败:")
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
@@ -860,23 +2072,25 @@ def use_prompt(prompt_id):
     return jsonify({"error": "提示词不存在"}), 404
 
 @app.route('/api/categories', methods=['GET'])
+@revision_etag
 def get_categories():
-    return jsonify(storage.get_all_categories())
+    return jsonify(cached_categories())
 
 @app.route('/api/categories/tree', methods=['GET'])
 def get_categories_tree():
     """获取分类树结构"""
-    return jsonify(storage.get_categories_tree())
+    return jsonify(cached_categories_tree())
 
 @app.route('/api/categories', methods=['POST'])
 def create_category():
     """创建分类"""
     try:
+        body = get_json_body()
         category_data = {
-            "name": request.json.get('name'),
-            "color": request.json.get('color', '#6B7280'),
-            "description": request.json.get('description', ''),
-            "parent_id": request.json.get('parent_id')
+            "name": body.get('name'),
+            "color": body.get('color', '#6B7280'),
+            "description": body.get('description', ''),
+            "parent_id": body.get('parent_id')
         }
 
         new_category = storage.create_category(category_data)
@@ -894,15 +2108,7 @@ def update_category(category_id):
         return jsonify({"error": "不能修改'未分类'分类"}), 403
 
     try:
-        update_data = {}
-        if request.json.get('name') is not None:
-            update_data["name"] = request.json.get('name')
-        if request.json.get('color') is not None:
-            update_data["color"] = request.json.get('color')
-        if request.json.get('description') is not None:
-            update_data["description"] = request.json.get('description')
-        if 'parent_id' in request.json:
-            update_data["parent_id"] = request.json.get('parent_id')
+        update_data = pick_fields(get_json_body(), ('name', 'color', 'description'), nullable=('parent_id',))
 
         updated_category = storage.update_category(category_id, update_data)
         if updated_category:
@@ -948,16 +2154,18 @@ def force_delete_category(category_id):
 
 # 标签管理API
 @app.route('/api/tags', methods=['GET'])
+@revision_etag
 def get_tags():
-    return jsonify(storage.get_all_tags())
+    return jsonify(cached_tags())
 
 @app.route('/api/tags', methods=['POST'])
 def create_tag():
     """创建标签"""
     try:
+        body = get_json_body()
         tag_data = {
-            "name": request.json.get('name'),
-            "color": request.json.get('color', '#3B82F6')
+            "name": body.get('name'),
+            "color": body.get('color', '#3B82F6')
         }
         
         new_tag = storage.create_tag(tag_data)
@@ -969,11 +2177,9 @@ def create_tag():
 def update_tag(tag_id):
     """更新标签"""
     try:
-        update_data = {
-            "name": request.json.get('name'),
-            "color": request.json.get('color')
-        }
-        
+        # 只更新请求中给出的字段，避免未提供的名称被置空
+        update_data = pick_fields(get_json_body(), ('name', 'color'))
+
         updated_tag = storage.update_tag(tag_id, update_data)
         if updated_tag:
             return jsonify(updated_tag)
@@ -993,34 +2199,97 @@ def delete_tag(tag_id):
     else:
         return jsonify({"error": "标签不存在"}), 404
 
+_search_cache = RevisionCache(maxsize=64)
+
 @app.route('/api/search', methods=['GET'])
 def search_prompts():
     query = request.args.get('q', '')
     category = request.args.get('category', '')
     category_id = request.args.get('category_id', '')
 
-    prompts = storage.search_prompts(query, category, category_id)
-    categories = storage.get_all_categories()
-    categories_tree = storage.get_categories_tree()
-    tags = storage.get_all_tags()
+    # 相同条件的搜索在数据未变化时直接复用结果
+    prompts = _search_cache.get((query, category, category_id),
+                                lambda: storage.search_prompts(query, category, category_id))
+    categories = cached_categories()
+    categories_tree = cached_categories_tree()
+    tags = cached_tags()
 
-    return jsonify({
+    result = {
         "prompts": prompts,
         "total": len(prompts),
         "categories": categories,
         "categories_tree": categories_tree,
         "tags": tags
-    })
-
-@app.route('/api/stats', methods=['GET'])
-def get_stats():
-    prompts = storage.get_all_prompts()
-    categories = storage.get_all_categories()
-    tags = storage.get_all_tags()
+    }
+
+    # 可选分页：传入limit时只返回一页，cursor为上一页返回的next_cursor（偏移量）
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        if limit <= 0:
+            return jsonify({"error": "limit必须为正整数"}), 400
+        offset = max(request.args.get('cursor', 0, type=int), 0)
+        result["prompts"] = prompts[offset:offset + limit]
+        result["next_cursor"] = offset + limit if offset + limit < len(prompts) else None
+
+    return jsonify(result)
+
+def build_descendants_map(categories):
+    """
+    一次性计算所有分类的后代分类ID（迭代后序遍历，每个分类只计算一次）
+
+    Args:
+        categories: 分类列表
+
+    Returns:
+        dict: 分类ID -> 后代分类ID列表
+    """
+    children_map = defaultdict(list)
+    for category in categories:
+        if category.get('parent_id'):
+            children_map[category['parent_id']].append(category['id'])
 
-    most_used_prompt = None
-    if prompts:
-        most_used_prompt = max(prompts, key=lambda p: p.get('usage_count', 0))
+    descendants = {}
+    visiting = set()
+    for category in categories:
+        stack = [(category['id'], False)]
+        while stack:
+            category_id, expanded = stack.pop()
+            if category_id in descendants:
+                continue
+            children = children_map.get(category_id, ())
+            if expanded:
+                result = []
+                for child_id in children:
+                    result.append(child_id)
+                    result.extend(descendants.get(child_id, ()))
+                descendants[category_id] = result
+                visiting.discard(category_id)
+            else:
+                # 数据异常出现循环引用时跳过正在访问的节点，避免死循环
+                visiting.add(category_id)
+                stack.append((category_id, True))
+                stack.extend((child_id, False) for child_id in children
+                             if child_id not in descendants and child_id not in visiting)
+    return descendants
+
+def build_stats():
+    """计算统计数据"""
+    # 只取各分类的提示词数量，无需加载全部提示词
+    prompt_counts = storage.get_category_prompt_counts()
+    categories = cached_categories()
+    tags = cached_tags()
+
+    most_used_prompt = storage.get_most_used_prompt()
+
+    # 建立计数索引：按分类ID计数；按旧版分类名计数时同时记录分类ID，避免与分类ID重复计数
+    by_cat_id = Counter()
+    by_cat_name = defaultdict(Counter)
+    for (category_id, category_name), n in prompt_counts.items():
+        by_cat_id[category_id] += n
+        if category_name:
+            by_cat_name[category_name][category_id] += n
+
+    descendants_map = build_descendants_map(categories)
 
     # 分层统计分类
     level_stats = {}
@@ -1034,12 +2303,12 @@ def get_stats():
 
         # 统计该分类下的提示词数量（包括子分类）
         category_id = category['id']
-        descendants = storage.get_category_descendants(category_id)
-        target_category_ids = [category_id] + descendants
+        target_category_ids = {category_id}
+        target_category_ids.update(descendants_map.get(category_id, ()))
 
-        count = len([p for p in prompts
-                    if p.get('category_id') in target_category_ids or
-                       p.get('category') == category['name']])
+        count = sum(by_cat_id[cid] for cid in target_category_ids)
+        count += sum(n for cid, n in by_cat_name.get(category['name'], {}).items()
+                     if cid not in target_category_ids)
 
         category_distribution.append({
             "id": category['id'],
@@ -1051,14 +2320,20 @@ def get_stats():
             "parent_id": category.get('parent_id')
         })
 
-    return jsonify({
-        "total_prompts": len(prompts),
+    return {
+        "total_prompts": sum(prompt_counts.values()),
         "total_categories": len(categories),
         "total_tags": len(tags),
         "most_used_prompt": most_used_prompt,
         "category_distribution": category_distribution,
         "level_stats": level_stats  # 新增：各层级分类统计
-    })
+    }
+
+@app.route('/api/stats', methods=['GET'])
+@revision_etag
+def get_stats():
+    # 统计结果只在数据变化后重新计算
+    return jsonify(_metadata_cache.get('stats', build_stats))
 
 @app.route('/api/debug-mode', methods=['GET'])
 def get_debug_mode():
@@ -1068,28 +2343,18 @@ def get_debug_mode():
     return jsonify({"debug": is_debug})
 
 
-@app.route('/api/export', methods=['GET'])
-def export_data():
-    """导出数据"""
-    # 根据参数过滤数据
-    search = request.args.get('search', '')
-    category = request.args.get('category', '')
-    category_id = request.args.get('category_id', '')
-    tags = request.args.get('tags', '').split(',') if request.args.get('tags') else []
-
-    # 使用 SQLiteStorage 的搜索方法获取提示词
-    prompts = storage.search_prompts(query=search, category=category, category_id=category_id)
+_export_cache = RevisionCache()
 
-    # 按标签过滤
-    if tags:
-        prompts = [p for p in prompts if
-                  p.get('tags') and any(tag in p['tags'] for tag in tags)]
+def build_export_rows(search, category, category_id, tags):
+    """按筛选条件生成导出数据行"""
+    # 使用存储的搜索方法获取提示词，标签过滤（包含任一查询标签）由存储通过索引完成
+    prompts = storage.search_prompts(query=search, category=category, category_id=category_id, tags=tags)
 
     # 导出格式
     export_data = []
     for prompt in prompts:
         # 使用分类路径（斜杠分隔），如果没有则使用分类名
-        category_display = prompt.get("category_path", prompt.get("category_name", ""))
+        category_display = prompt.get("category_path") or prompt.get("category_name", "")
 
         export_data.append({
             "标题": prompt["title"],
@@ -1100,18 +2365,57 @@ def export_data():
             "创建时间": prompt.get("created_at", ""),
             "更新时间": prompt.get("updated_at", "")
         })
+    return export_data
 
-    return jsonify({
-        "data": export_data,
-        "total": len(export_data),
-        "exported_at": datetime.now().isoformat()
-    })
+@app.route('/api/export', methods=['GET'])
+def export_data():
+    """导出数据"""
+    # 根据参数过滤数据
+    search = request.args.get('search', '')
+    category = request.args.get('category', '')
+    category_id = request.args.get('category_id', '')
+    # 标签参数只解析一次：去除空白和空项，顺序与重复无关，用frozenset同时作为缓存键
+    raw_tags = request.args.get('tags', '')
+    tags = frozenset(t for t in map(str.strip, raw_tags.split(',')) if t) if raw_tags else frozenset()
+
+    # 同样的筛选条件在数据未变化时直接复用上次的导出结果
+    export_data = _export_cache.get((search, category, category_id, tags),
+                                    lambda: build_export_rows(search, category, category_id, tags))
+
+    if request.args.get('format') == 'ndjson':
+        # 每行一个JSON对象，客户端可以边接收边处理
+        return Response(stream_export_ndjson(export_data), mimetype='application/x-ndjson')
+
+    exported_at = datetime.now().isoformat()
+    return Response(stream_export_json(export_data, exported_at), mimetype='application/json')
+
+def stream_export_ndjson(rows):
+    """逐行生成NDJSON格式的导出数据"""
+    for row in rows:
+        yield json_dumps(row, indent=False) + b"\n"
+
+def stream_export_json(rows, exported_at, chunk_size=500):
+    """
+    分块生成导出响应：{"data": [...], "total": N, "exported_at": "..."}
+    每次只序列化chunk_size行，不在内存中拼出完整的响应体
+    """
+    yield b'{"data":'
+    yield from stream_json_array(rows, chunk_size)
+    yield b',"total":%d,"exported_at":%s}' % (len(rows), json_dumps(exported_at, indent=False))
+
+def stream_json_array(rows, chunk_size=500):
+    """分块生成JSON数组，每次只序列化chunk_size行，不在内存中拼出完整的响应体"""
+    yield b'['
+    for start in range(0, len(rows), chunk_size):
+        chunk = b",".join(json_dumps(row, indent=False) for row in rows[start:start + chunk_size])
+        yield (b"," + chunk) if start else chunk
+    yield b']'
 
 @app.route('/api/import', methods=['POST'])
 def import_data():
     """导入数据"""
     try:
-        import_data_json = request.json
+        import_data_json = get_json_body()
 
         if not import_data_json or 'prompts' not in import_data_json:
             return jsonify({"error": "无效的导入数据格式"}), 400
@@ -1164,9 +2468,6 @@ def import_database():
             return jsonify({"error": "只能导入 .db 文件"}), 400
 
         # 保存上传的文件到临时位置
-        import tempfile
-        import os
-
         with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as temp_file:
             file.save(temp_file.name)
             temp_path = temp_file.name
@@ -1180,8 +2481,8 @@ def import_database():
 
             # 获取导入后的数据统计
             prompts = storage.get_all_prompts()
-            categories = storage.get_all_categories()
-            tags = storage.get_all_tags()
+            categories = cached_categories()
+            tags = cached_tags()
 
             return jsonify({
                 "message": f"数据库导入成功！原数据已备份到 {backup_file}",
@@ -1227,6 +2528,7 @@ def clear_all_data():
 
 # 版本控制API
 @app.route('/api/prompts/<prompt_id>/versions', methods=['GET'])
+@revision_etag
 def get_prompt_versions(prompt_id):
     """获取提示词的所有版本"""
     prompt = storage.get_prompt_by_id(prompt_id)
@@ -1242,7 +2544,7 @@ def get_prompt_versions(prompt_id):
 def create_prompt_version(prompt_id):
     """创建新版本"""
     try:
-        version_data = request.json
+        version_data = get_json_body()
         result = storage.create_prompt_version(prompt_id, version_data)
         if result:
             return jsonify(result), 201
@@ -1276,7 +2578,18 @@ def delete_prompt_version(prompt_id, version):
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
+    init_app(app)
     config = load_config()
     port = config.get('port', 5001)
     debug = config.get('debug', True)
-    app.run(host='0.0.0.0', port=port, debug=debug)
+    if debug:
+        # 开发服务器仅用于调试（自动重载、调试器）
+        app.run(host='0.0.0.0', port=port, debug=debug)
+    else:
+        try:
+            # 非debug模式优先使用多线程的waitress（可选依赖，跨平台）
+            from waitress import serve
+        except ImportError:
+            app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
+        else:
+            serve(app, host='0.0.0.0', port=port, threads=8)
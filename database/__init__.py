@@ -4,6 +4,7 @@
 PromptHub数据库包
 """
 
+from .ids import new_id
 from .init_db import init_database, get_database_connection, check_database_exists
 from .sqlite_storage import SQLiteStorage
 from .migrate_from_json import check_migration_needed
@@ -13,5 +14,6 @@ __all__ = [
     'get_database_connection',
     'check_database_exists',
     'SQLiteStorage',
-    'check_migration_needed'
+    'check_migration_needed',
+    'new_id'
 ]
\ No newline at end of file
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PromptHub对象id生成
+"""
+
+import os
+import random
+
+# 进程内随机数生成器，仅在启动（及fork出子进程）时从系统熵源取一次种子，
+# 之后生成id无需每次都调用getrandom/urandom
+_rng = random.Random(os.urandom(32))
+
+
+def _reseed():
+    """fork后的子进程重新取种子，避免多个worker进程生成相同的id序列"""
+    _rng.seed(os.urandom(32))
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reseed)
+
+
+def new_id() -> str:
+    """
+    生成新对象的id，格式与str(uuid.uuid4())相同（带版本号和变体位的36位字符串）
+
+    id只用于标识对象，不用于安全用途，因此使用普通伪随机数即可
+    """
+    bits = _rng.getrandbits(128)
+    # 与uuid4一致：版本号4，变体RFC 4122
+    bits = (bits & ~(0xf000 << 64)) | (0x4000 << 64)
+    bits = (bits & ~(0xc000 << 48)) | (0x8000 << 48)
+    h = "%032x" % bits
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
@@ -9,6 +9,112 @@ import sqlite3
 import os
 from pathlib import Path
 
+# 提示词全文索引：FTS5外部内容表，使用trigram分词以支持中英文任意子串搜索，
+# 由触发器与prompts表保持同步（仅在标题、内容、描述变化时更新索引）。
+# prompts表以TEXT为主键，其隐式rowid可能被VACUUM重新编号，因此不能作为索引的rowid；
+# 索引行改为关联prompts_fts_docs表中的docid（INTEGER PRIMARY KEY，VACUUM不会改变），
+# 通过视图prompts_fts_content按docid读取提示词内容
+FTS_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS prompts_fts_docs (
+    docid INTEGER PRIMARY KEY,
+    prompt_id TEXT NOT NULL UNIQUE
+);
+
+CREATE VIEW IF NOT EXISTS prompts_fts_content AS
+    SELECT d.docid, p.title, p.content, p.description
+    FROM prompts_fts_docs d JOIN prompts p ON p.id = d.prompt_id;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS prompts_fts USING fts5(
+    title, content, description,
+    content='prompts_fts_content', content_rowid='docid', tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS prompts_fts_ai AFTER INSERT ON prompts BEGIN
+    INSERT OR IGNORE INTO prompts_fts_docs(prompt_id) VALUES (new.id);
+    INSERT INTO prompts_fts(rowid, title, content, description)
+    VALUES ((SELECT docid FROM prompts_fts_docs WHERE prompt_id = new.id),
+            new.title, new.content, new.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS prompts_fts_ad AFTER DELETE ON prompts BEGIN
+    INSERT INTO prompts_fts(prompts_fts, rowid, title, content, description)
+    VALUES ('delete', (SELECT docid FROM prompts_fts_docs WHERE prompt_id = old.id),
+            old.title, old.content, old.description);
+    DELETE FROM prompts_fts_docs WHERE prompt_id = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS prompts_fts_au AFTER UPDATE OF title, content, description ON prompts BEGIN
+    INSERT INTO prompts_fts(prompts_fts, rowid, title, content, description)
+    VALUES ('delete', (SELECT docid FROM prompts_fts_docs WHERE prompt_id = old.id),
+            old.title, old.content, old.description);
+    INSERT INTO prompts_fts(rowid, title, content, description)
+    VALUES ((SELECT docid FROM prompts_fts_docs WHERE prompt_id = new.id),
+            new.title, new.content, new.description);
+END;
+"""
+
+# 旧版全文索引直接按prompts表的隐式rowid关联，升级时删除后按新结构重建
+LEGACY_FTS_DROP_SQL = """
+DROP TRIGGER IF EXISTS prompts_fts_ai;
+DROP TRIGGER IF EXISTS prompts_fts_ad;
+DROP TRIGGER IF EXISTS prompts_fts_au;
+DROP TABLE IF EXISTS prompts_fts;
+"""
+
+# 后续版本新增的索引：旧数据库启动时补建（新数据库已在schema.sql中创建）
+EXTRA_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_prompts_usage_count ON prompts(usage_count, updated_at);
+"""
+
+def enable_wal(conn):
+    """
+    将数据库切换为WAL日志模式（该设置保存在数据库文件中，只需执行一次）：
+    读写互不阻塞，提交时只追加WAL文件而不必改写数据库页
+    """
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+    except sqlite3.OperationalError:
+        # 数据库正被其它连接锁定等情况下保持原日志模式，下次启动再尝试
+        pass
+
+def ensure_indexes(conn):
+    """确保后续版本新增的索引存在"""
+    conn.executescript(EXTRA_INDEX_SQL)
+    conn.commit()
+
+def ensure_fts(conn):
+    """
+    确保提示词全文索引存在，新建时根据prompts表重建索引
+
+    Args:
+        conn: 数据库连接
+
+    Returns:
+        bool: 全文索引是否可用（SQLite未编译FTS5或不支持trigram分词时为False）
+    """
+    try:
+        row = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name='prompts_fts'"
+        ).fetchone()
+        exists = row is not None and "prompts_fts_content" in row[0]
+        script = FTS_SCHEMA_SQL if exists or row is None else LEGACY_FTS_DROP_SQL + FTS_SCHEMA_SQL
+        # 在同一事务中建表，中途失败（如不支持trigram分词）时不会留下半套触发器
+        conn.executescript(f"BEGIN;\n{script}\nCOMMIT;")
+        if not exists:
+            rebuild_fts(conn)
+        return True
+    except sqlite3.OperationalError:
+        if conn.in_transaction:
+            conn.rollback()
+        return False
+
+def rebuild_fts(conn):
+    """根据prompts表重建全文索引（批量写入或直接替换数据后调用）"""
+    conn.execute("DELETE FROM prompts_fts_docs WHERE prompt_id NOT IN (SELECT id FROM prompts)")
+    conn.execute("INSERT OR IGNORE INTO prompts_fts_docs(prompt_id) SELECT id FROM prompts")
+    conn.execute("INSERT INTO prompts_fts(prompts_fts) VALUES ('rebuild')")
+    conn.commit()
+
 def init_database(db_path="data/prompthub.db", schema_path="database/schema.sql"):
     """
     初始化SQLite数据库
@@ -34,12 +140,14 @@ def init_database(db_path="data/prompthub.db", schema_path="database/schema.sql"
     try:
         # 启用外键约束
         conn.execute("PRAGMA foreign_keys = ON")
+        # 新建的数据库直接使用WAL模式
+        enable_wal(conn)
         
-        # 执行SQL模式
-        conn.executescript(schema_sql)
-        
-        # 提交事务
-        conn.commit()
+        # 在同一事务中执行SQL模式，中途失败时不会留下只建了一半的表结构
+        conn.executescript(f"BEGIN;\n{schema_sql}\nCOMMIT;")
+
+        # 创建全文索引（不支持时搜索回退为LIKE）
+        ensure_fts(conn)
         print(f"数据库初始化成功: {db_path}")
         
     except Exception as e:
@@ -79,6 +187,10 @@ def get_database_connection(db_path="data/prompthub.db"):
     # 创建连接并启用外键约束
     conn = sqlite3.connect(db_path)
     conn.execute("PRAGMA foreign_keys = ON")
+    # WAL模式下NORMAL同步级别不会损坏数据库，且提交时无需每次fsync
+    conn.execute("PRAGMA synchronous = NORMAL")
+    # 排序、分组等产生的临时数据放在内存中，不写临时文件
+    conn.execute("PRAGMA temp_store = MEMORY")
     
     # 设置行工厂，使查询结果以字典形式返回
     conn.row_factory = sqlite3.Row
@@ -6,13 +6,20 @@ PromptHub JSON到SQLite数据迁移脚本
 """
 
 import json
+import shutil
 import sqlite3
 import os
+import sys
 import uuid
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Any
 
+# 以脚本方式运行时确保项目根目录可被导入（作为模块导入时不修改sys.path）
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.init_db import init_database, ensure_fts, rebuild_fts
+
 def migrate_from_json(json_path: str = "data/prompts.json", 
                      db_path: str = "data/prompthub.db",
                      schema_path: str = "database/schema.sql") -> Dict[str, Any]:
@@ -32,14 +39,9 @@ def migrate_from_json(json_path: str = "data/prompts.json",
         raise FileNotFoundError(f"JSON数据文件不存在: {json_path}")
     
     # 读取JSON数据
-    with open(json_path, 'r', encoding='utf-8') as f:
-        json_data = json.load(f)
+    json_data = json.loads(Path(json_path).read_bytes())
     
     # 初始化数据库
-    import sys
-    import os
-    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from database.init_db import init_database
     init_database(db_path, schema_path)
     
     # 连接数据库
@@ -212,6 +214,10 @@ def migrate_from_json(json_path: str = "data/prompts.json",
         
         # 提交事务
         conn.commit()
+
+        # INSERT OR REPLACE不会触发删除触发器，迁移完成后整体重建全文索引
+        if ensure_fts(conn):
+            rebuild_fts(conn)
         
         return stats
     except Exception as e:
@@ -240,7 +246,6 @@ def backup_json_data(json_path: str = "data/prompts.json") -> str:
     backup_file = backup_dir / f"prompts_json_backup_{timestamp}.json"
     
     # 复制文件
-    import shutil
     shutil.copy2(json_path, backup_file)
     
     return str(backup_file)
@@ -77,6 +77,7 @@ CREATE INDEX IF NOT EXISTS idx_prompts_category_name ON prompts(category_name);
 CREATE INDEX IF NOT EXISTS idx_prompts_title ON prompts(title);
 CREATE INDEX IF NOT EXISTS idx_prompts_created_at ON prompts(created_at);
 CREATE INDEX IF NOT EXISTS idx_prompts_updated_at ON prompts(updated_at);
+CREATE INDEX IF NOT EXISTS idx_prompts_usage_count ON prompts(usage_count, updated_at);
 CREATE INDEX IF NOT EXISTS idx_categories_parent_id ON categories(parent_id);
 CREATE INDEX IF NOT EXISTS idx_categories_level ON categories(level);
 CREATE INDEX IF NOT EXISTS idx_categories_path ON categories(path);
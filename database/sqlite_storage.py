@@ -5,12 +5,21 @@ PromptHub SQLite数据库存储类
 替换原有的FileStorage类，提供相同接口但使用SQLite作为后端存储
 """
 
+import shutil
 import sqlite3
+import threading
 import uuid
 from datetime import datetime
 from pathlib import Path
+from collections import defaultdict
 from typing import List, Dict, Any, Optional
-from database.init_db import get_database_connection, init_database
+from database.ids import new_id
+from database.init_db import get_database_connection, init_database, ensure_fts, ensure_indexes, enable_wal
+
+# 各表允许通过update_*修改的列（集合成员判断，构建UPDATE语句时只遍历一次更新数据）
+PROMPT_UPDATE_FIELDS = frozenset(("title", "content", "description", "category_id", "category_name", "category_path"))
+CATEGORY_UPDATE_FIELDS = frozenset(("name", "color", "description", "parent_id", "level"))
+TAG_UPDATE_FIELDS = frozenset(("name", "color"))
 
 class SQLiteStorage:
     """SQLite数据库存储类，替换原有的FileStorage类"""
@@ -28,6 +37,43 @@ class SQLiteStorage:
         # 确保数据库已初始化
         if not Path(db_path).exists():
             init_database(db_path, schema_path)
+
+        # 旧数据库可能尚无全文索引，启动时补建
+        self._fts_enabled = self._ensure_fts()
+
+        # 数据版本号：通过一个常驻连接读取PRAGMA data_version，
+        # 其它连接（包括其它worker进程）提交写入后该值会变化
+        self._instance_id = uuid.uuid4().hex[:8]
+        self._revision_lock = threading.Lock()
+        self._watch_conn = None
+        self._replaced = 0  # 数据库文件被整体替换的次数
+
+    @property
+    def revision(self) -> str:
+        """当前数据版本号（字符串），数据未变化时保持不变"""
+        with self._revision_lock:
+            if self._watch_conn is None:
+                self._watch_conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            data_version = self._watch_conn.execute("PRAGMA data_version").fetchone()[0]
+            return f"{self._instance_id}-{self._replaced}-{data_version}"
+
+    def _reset_revision(self):
+        """数据库文件被替换后重新打开版本监视连接"""
+        with self._revision_lock:
+            if self._watch_conn is not None:
+                self._watch_conn.close()
+                self._watch_conn = None
+            self._replaced += 1
+
+    def _ensure_fts(self) -> bool:
+        """启用WAL模式，确保新增索引和全文索引存在，返回全文索引是否可用"""
+        conn = self._get_connection()
+        try:
+            enable_wal(conn)
+            ensure_indexes(conn)
+            return ensure_fts(conn)
+        finally:
+            conn.close()
     
     def _get_connection(self):
         """获取数据库连接"""
@@ -228,74 +274,114 @@ class SQLiteStorage:
         conn = self._get_connection()
         try:
             cursor = conn.cursor()
-            
-            # 获取分类信息
-            category_id = prompt_data.get("category_id")
-            category_name = prompt_data.get("category", "其他")
-            category_path = category_name
-
-            if category_id:
-                cursor.execute("SELECT name, path FROM categories WHERE id = ?", (category_id,))
-                category = cursor.fetchone()
-                if category:
-                    category_name = category['name']
-                    category_path = category['path']
-                else:
-                    # 如果分类不存在，设置为NULL以满足外键约束
-                    category_id = None
-            
-            # 生成ID和时间戳
-            prompt_id = str(uuid.uuid4())
-            now = datetime.now().isoformat()
-            
-            # 插入提示词
-            cursor.execute("""
-                INSERT INTO prompts (
-                    id, title, content, description, category_id, 
-                    category_name, category_path, usage_count, 
-                    current_version, created_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                prompt_id,
-                prompt_data["title"],
-                prompt_data["content"],
-                prompt_data.get("description", ""),
-                category_id,
-                category_name,
-                category_path,
-                0,
-                "1.0",
-                now,
-                now
-            ))
-            
-            # 插入版本信息
-            cursor.execute("""
-                INSERT INTO prompt_versions (
-                    prompt_id, version, title, content, description, change_note, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                prompt_id,
-                "1.0",
-                prompt_data["title"],
-                prompt_data["content"],
-                prompt_data.get("description", ""),
-                "初始版本",
-                now
-            ))
-            
-            # 添加标签
-            tags = prompt_data.get("tags", [])
-            for tag_name in tags:
-                self._add_tag_to_prompt(cursor, prompt_id, tag_name)
-            
+            prompt_id = self._insert_prompt(cursor, prompt_data)
             conn.commit()
             
             # 返回创建的提示词
             return self.get_prompt_by_id(prompt_id)
         finally:
             conn.close()
+
+    def bulk_create_prompts(self, prompts_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """批量创建提示词（同一事务内完成，只提交一次）"""
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            prompt_ids = [self._insert_prompt(cursor, prompt_data) for prompt_data in prompts_data]
+            conn.commit()
+            return [self.get_prompt_by_id(prompt_id) for prompt_id in prompt_ids]
+        finally:
+            conn.close()
+
+    def _insert_prompt(self, cursor: sqlite3.Cursor, prompt_data: Dict[str, Any]) -> str:
+        """在当前事务中插入提示词及其初始版本和标签，返回新提示词ID"""
+        # 获取分类信息
+        category_id = prompt_data.get("category_id")
+        category_name = prompt_data.get("category", "其他")
+        category_path = category_name
+
+        if category_id:
+            cursor.execute("SELECT name, path FROM categories WHERE id = ?", (category_id,))
+            category = cursor.fetchone()
+            if category:
+                category_name = category['name']
+                category_path = category['path']
+            else:
+                # 如果分类不存在，设置为NULL以满足外键约束
+                category_id = None
+        
+        # 生成ID和时间戳
+        prompt_id = new_id()
+        now = datetime.now().isoformat()
+        
+        # 插入提示词
+        cursor.execute("""
+            INSERT INTO prompts (
+                id, title, content, description, category_id, 
+                category_name, category_path, usage_count, 
+                current_version, created_at, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            prompt_id,
+            prompt_data["title"],
+            prompt_data["content"],
+            prompt_data.get("description", ""),
+            category_id,
+            category_name,
+            category_path,
+            0,
+            "1.0",
+            now,
+            now
+        ))
+        
+        # 插入版本信息
+        cursor.execute("""
+            INSERT INTO prompt_versions (
+                prompt_id, version, title, content, description, change_note, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            prompt_id,
+            "1.0",
+            prompt_data["title"],
+            prompt_data["content"],
+            prompt_data.get("description", ""),
+            "初始版本",
+            now
+        ))
+        
+        # 添加标签
+        tags = prompt_data.get("tags", [])
+        for tag_name in tags:
+            self._add_tag_to_prompt(cursor, prompt_id, tag_name, now)
+
+        return prompt_id
     
+    def get_category_prompt_counts(self) -> Dict[tuple, int]:
+        """
+        按分类统计提示词数量（GROUP BY，不加载提示词本身）
+
+        Returns:
+            dict: (分类ID, 旧版分类名) -> 数量；数据库中分类名与分类ID一一对应，旧版分类名恒为None
+        """
+        conn = self._get_connection()
+        try:
+            rows = conn.execute("SELECT category_id, COUNT(*) AS count FROM prompts GROUP BY category_id").fetchall()
+            return {(row['category_id'], None): row['count'] for row in rows}
+        finally:
+            conn.close()
+
+    def get_most_used_prompt(self) -> Optional[Dict[str, Any]]:
+        """获取使用次数最多的提示词（通过usage_count索引，无需加载全部提示词）"""
+        conn = self._get_connection()
+        try:
+            row = conn.execute("""
+                SELECT id FROM prompts ORDER BY usage_count DESC, updated_at DESC LIMIT 1
+            """).fetchone()
+        finally:
+            conn.close()
+        return self.get_prompt_by_id(row['id']) if row else None
+
     def get_prompt_by_id(self, prompt_id: str) -> Optional[Dict[str, Any]]:
         """根据ID获取提示词"""
         conn = self._get_connection()
@@ -335,64 +421,86 @@ class SQLiteStorage:
         conn = self._get_connection()
         try:
             cursor = conn.cursor()
-            
-            # 检查提示词是否存在
-            if not self._prompt_exists(cursor, prompt_id):
+            if not self._apply_prompt_update(cursor, prompt_id, update_data):
                 return None
-            
-            # 处理分类信息更新
-            if "category_id" in update_data:
-                category_id = update_data["category_id"]
-                if category_id:
-                    cursor.execute("SELECT name, path FROM categories WHERE id = ?", (category_id,))
-                    category = cursor.fetchone()
-                    if category:
-                        update_data["category_name"] = category['name']
-                        update_data["category_path"] = category['path']
-                    else:
-                        # 如果分类不存在，设置为NULL以满足外键约束
-                        update_data["category_id"] = None
-                        update_data["category_name"] = "其他"
-                        update_data["category_path"] = "其他"
-            
-            # 构建更新SQL
-            update_fields = []
-            update_values = []
+            conn.commit()
+            return self.get_prompt_by_id(prompt_id)
+        finally:
+            conn.close()
 
-            for field, value in update_data.items():
-                if field in ["title", "content", "description", "category_id", "category_name", "category_path"]:
-                    update_fields.append(f"{field} = ?")
-                    update_values.append(value)
+    def bulk_update_prompts(self, updates: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """批量更新提示词（每项需包含id，同一事务内完成），不存在的提示词对应结果为None"""
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            updated_ids = []
+            for update_data in updates:
+                update_data = dict(update_data)
+                prompt_id = update_data.pop("id", None)
+                applied = prompt_id and self._apply_prompt_update(cursor, prompt_id, update_data)
+                updated_ids.append(prompt_id if applied else None)
+            conn.commit()
+            return [self.get_prompt_by_id(prompt_id) if prompt_id else None for prompt_id in updated_ids]
+        finally:
+            conn.close()
 
-            if update_fields:
-                update_fields.append("updated_at = ?")
-                update_values.append(datetime.now().isoformat())
-                update_values.append(prompt_id)
+    def _apply_prompt_update(self, cursor: sqlite3.Cursor, prompt_id: str, update_data: Dict[str, Any]) -> bool:
+        """在当前事务中更新提示词，提示词不存在时返回False"""
+        # 检查提示词是否存在
+        if not self._prompt_exists(cursor, prompt_id):
+            return False
+        
+        # 处理分类信息更新
+        if "category_id" in update_data:
+            category_id = update_data["category_id"]
+            if category_id:
+                cursor.execute("SELECT name, path FROM categories WHERE id = ?", (category_id,))
+                category = cursor.fetchone()
+                if category:
+                    update_data["category_name"] = category['name']
+                    update_data["category_path"] = category['path']
+                else:
+                    # 如果分类不存在，设置为NULL以满足外键约束
+                    update_data["category_id"] = None
+                    update_data["category_name"] = "其他"
+                    update_data["category_path"] = "其他"
+        
+        # 构建更新SQL
+        update_fields = []
+        update_values = []
 
-                sql = f"UPDATE prompts SET {', '.join(update_fields)} WHERE id = ?"
-                cursor.execute(sql, update_values)
+        for field, value in update_data.items():
+            if field in PROMPT_UPDATE_FIELDS:
+                update_fields.append(f"{field} = ?")
+                update_values.append(value)
 
-            # 如果更新了标签，需要更新prompt_tags表
-            if "tags" in update_data:
-                self._update_prompt_tags(cursor, prompt_id, update_data["tags"])
+        now = datetime.now().isoformat()
+        if update_fields:
+            update_fields.append("updated_at = ?")
+            update_values.append(now)
+            update_values.append(prompt_id)
 
-            conn.commit()
-            return self.get_prompt_by_id(prompt_id)
-        finally:
-            conn.close()
+            sql = f"UPDATE prompts SET {', '.join(update_fields)} WHERE id = ?"
+            cursor.execute(sql, update_values)
+
+        # 如果更新了标签，需要更新prompt_tags表
+        if "tags" in update_data:
+            self._update_prompt_tags(cursor, prompt_id, update_data["tags"], now)
+
+        return True
     
     def _prompt_exists(self, cursor: sqlite3.Cursor, prompt_id: str) -> bool:
         """检查提示词是否存在"""
         cursor.execute("SELECT 1 FROM prompts WHERE id = ?", (prompt_id,))
         return cursor.fetchone() is not None
     
-    def _add_tag_to_prompt(self, cursor: sqlite3.Cursor, prompt_id: str, tag_name: str):
-        """为提示词添加标签"""
+    def _add_tag_to_prompt(self, cursor: sqlite3.Cursor, prompt_id: str, tag_name: str, now: Optional[str] = None):
+        """为提示词添加标签（now为调用方已生成的时间戳，批量添加时复用）"""
         if not tag_name or not tag_name.strip():
             return
 
         tag_name = tag_name.strip()
-        now = datetime.now().isoformat()
+        now = now or datetime.now().isoformat()
 
         # 确保标签存在，获取或创建 tag_id
         cursor.execute("SELECT id FROM tags WHERE name = ?", (tag_name,))
@@ -401,7 +509,7 @@ class SQLiteStorage:
         if result:
             tag_id = result['id']
         else:
-            tag_id = str(uuid.uuid4())
+            tag_id = new_id()
             cursor.execute("""
                 INSERT INTO tags (id, name, color, created_at, updated_at)
                 VALUES (?, ?, ?, ?, ?)
@@ -419,14 +527,16 @@ class SQLiteStorage:
             VALUES (?, ?, ?)
         """, (prompt_id, tag_id, now))
     
-    def _update_prompt_tags(self, cursor: sqlite3.Cursor, prompt_id: str, tags: List[str]):
+    def _update_prompt_tags(self, cursor: sqlite3.Cursor, prompt_id: str, tags: List[str], now: Optional[str] = None):
         """更新提示词的标签"""
+        now = now or datetime.now().isoformat()
+
         # 删除现有标签关联
         cursor.execute("DELETE FROM prompt_tags WHERE prompt_id = ?", (prompt_id,))
         
         # 添加新标签关联
         for tag_name in tags:
-            self._add_tag_to_prompt(cursor, prompt_id, tag_name)
+            self._add_tag_to_prompt(cursor, prompt_id, tag_name, now)
     
     def delete_prompt(self, prompt_id: str) -> bool:
         """删除提示词"""
@@ -451,18 +561,16 @@ class SQLiteStorage:
         conn = self._get_connection()
         try:
             cursor = conn.cursor()
-            
-            # 检查提示词是否存在
-            if not self._prompt_exists(cursor, prompt_id):
-                return None
-            
-            # 增加使用计数
+
+            # 增加使用计数（提示词不存在时影响行数为0，无需事先单独查询）
             cursor.execute("""
                 UPDATE prompts 
                 SET usage_count = usage_count + 1, updated_at = ?
                 WHERE id = ?
             """, (datetime.now().isoformat(), prompt_id))
-            
+            if cursor.rowcount == 0:
+                return None
+
             conn.commit()
             return self.get_prompt_by_id(prompt_id)
         finally:
@@ -506,17 +614,23 @@ class SQLiteStorage:
         
         return root_categories
     
-    def _build_category_path(self, category_id: str, categories_dict: Dict[str, Dict[str, Any]]) -> str:
-        """构建分类的完整路径"""
-        if category_id not in categories_dict:
-            return ""
-        
-        category = categories_dict[category_id]
-        if category["parent_id"] is None:
-            return category["name"]
-        
-        parent_path = self._build_category_path(category["parent_id"], categories_dict)
-        return f"{parent_path}/{category['name']}" if parent_path else category["name"]
+    def _build_all_paths(self, categories_dict: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+        """一次性计算所有分类的完整路径：迭代向上查找祖先，已算出的路径直接复用"""
+        paths = {}
+        for category_id in categories_dict:
+            # 收集尚未计算路径的祖先链（自身在前）
+            chain = []
+            current = category_id
+            while current in categories_dict and current not in paths and current not in chain:
+                chain.append(current)
+                current = categories_dict[current]["parent_id"]
+
+            base = paths.get(current, "")
+            for cid in reversed(chain):
+                name = categories_dict[cid]["name"]
+                base = f"{base}/{name}" if base else name
+                paths[cid] = base
+        return paths
     
     def _update_category_paths(self, cursor=None):
         """更新所有分类的路径"""
@@ -528,16 +642,15 @@ class SQLiteStorage:
 
         try:
             # 获取所有分类
-            cursor.execute("SELECT * FROM categories")
-            categories = [self._row_to_dict(row) for row in cursor.fetchall()]
-            categories_dict = {cat["id"]: cat for cat in categories}
+            cursor.execute("SELECT id, name, parent_id, path FROM categories")
+            categories_dict = {row["id"]: self._row_to_dict(row) for row in cursor.fetchall()}
+            paths = self._build_all_paths(categories_dict)
 
-            # 更新路径
-            for category in categories:
-                path = self._build_category_path(category["id"], categories_dict)
-                cursor.execute("""
-                    UPDATE categories SET path = ? WHERE id = ?
-                """, (path, category["id"]))
+            # 只更新路径发生变化的分类
+            cursor.executemany("""
+                UPDATE categories SET path = ? WHERE id = ?
+            """, [(path, category_id) for category_id, path in paths.items()
+                  if categories_dict[category_id]["path"] != path])
 
             # 只有在自己创建连接时才commit和close
             if own_connection:
@@ -546,21 +659,41 @@ class SQLiteStorage:
             if own_connection:
                 conn.close()
     
+    def _update_subtree_paths(self, cursor, root_id: str):
+        """只重新计算指定分类及其子树的路径（父分类路径视为已正确）"""
+        cursor.execute("""
+            WITH RECURSIVE subtree(id, path) AS (
+                SELECT c.id,
+                       CASE WHEN p.path IS NULL OR p.path = '' THEN c.name
+                            ELSE p.path || '/' || c.name END
+                FROM categories c LEFT JOIN categories p ON p.id = c.parent_id
+                WHERE c.id = ?
+                UNION ALL
+                SELECT c.id, subtree.path || '/' || c.name
+                FROM categories c JOIN subtree ON c.parent_id = subtree.id
+            )
+            UPDATE categories
+            SET path = (SELECT path FROM subtree WHERE subtree.id = categories.id)
+            WHERE id IN (SELECT id FROM subtree)
+        """, (root_id,))
+
     def get_category_descendants(self, category_id: str) -> List[str]:
         """获取分类的所有后代分类ID（公开方法）"""
         conn = self._get_connection()
         try:
             cursor = conn.cursor()
+            # 一次查询取出父子关系构建邻接表，再迭代遍历子树，避免逐层递归查询
+            cursor.execute("SELECT id, parent_id FROM categories WHERE parent_id IS NOT NULL")
+            children = defaultdict(list)
+            for row in cursor.fetchall():
+                children[row['parent_id']].append(row['id'])
+
             descendants = []
-            
-            def find_children(parent_id):
-                cursor.execute("SELECT id FROM categories WHERE parent_id = ?", (parent_id,))
-                children = cursor.fetchall()
-                for child in children:
-                    descendants.append(child['id'])
-                    find_children(child['id'])
-            
-            find_children(category_id)
+            stack = [category_id]
+            while stack:
+                kids = children.get(stack.pop(), ())
+                descendants.extend(kids)
+                stack.extend(kids)
             return descendants
         finally:
             conn.close()
@@ -583,8 +716,9 @@ class SQLiteStorage:
                     if level > 5:  # 最多支持5级
                         raise ValueError("分类层级不能超过5级")
             
-            # 生成ID
-            category_id = str(uuid.uuid4())
+            # 生成ID和时间戳
+            category_id = new_id()
+            now = datetime.now().isoformat()
             
             # 插入分类
             cursor.execute("""
@@ -599,12 +733,12 @@ class SQLiteStorage:
                 parent_id,
                 level,
                 "",  # 路径稍后计算
-                datetime.now().isoformat(),
-                datetime.now().isoformat()
+                now,
+                now
             ))
 
-            # 重新计算所有分类的路径（传入cursor避免创建新连接）
-            self._update_category_paths(cursor)
+            # 新分类没有子分类，只需计算它自己的路径
+            self._update_subtree_paths(cursor, category_id)
 
             # 获取创建的分类（使用当前cursor）
             cursor.execute("SELECT * FROM categories WHERE id = ?", (category_id,))
@@ -669,20 +803,24 @@ class SQLiteStorage:
             update_values = []
             
             for field, value in update_data.items():
-                if field in ["name", "color", "description", "parent_id", "level"]:
+                if field in CATEGORY_UPDATE_FIELDS:
                     update_fields.append(f"{field} = ?")
                     update_values.append(value)
             
+            now = datetime.now().isoformat()
             if update_fields:
                 update_fields.append("updated_at = ?")
-                update_values.append(datetime.now().isoformat())
+                update_values.append(now)
                 update_values.append(category_id)
 
                 sql = f"UPDATE categories SET {', '.join(update_fields)} WHERE id = ?"
                 cursor.execute(sql, update_values)
 
-            # 重新计算所有分类的路径（传入cursor避免创建新连接）
-            self._update_category_paths(cursor)
+            # 名称或父分类变化只影响该分类及其子树的路径，仅修改颜色、描述时无需重算
+            name_changed = "name" in update_data and update_data["name"] != old_name
+            parent_changed = "parent_id" in update_data and update_data["parent_id"] != category["parent_id"]
+            if name_changed or parent_changed:
+                self._update_subtree_paths(cursor, category_id)
 
             # 获取更新后的分类信息（使用当前cursor）
             cursor.execute("SELECT * FROM categories WHERE id = ?", (category_id,))
@@ -698,7 +836,7 @@ class SQLiteStorage:
                 """, (
                     updated_category["name"],
                     new_path,
-                    datetime.now().isoformat(),
+                    now,
                     category_id,
                     old_name
                 ))
@@ -839,7 +977,7 @@ class SQLiteStorage:
                 # 如果标签已存在，返回已有标签信息
                 return self._row_to_dict(existing_tag)
 
-            tag_id = str(uuid.uuid4())
+            tag_id = new_id()
             now = datetime.now().isoformat()
 
             cursor.execute("""
@@ -892,7 +1030,7 @@ class SQLiteStorage:
             update_values = []
 
             for field, value in update_data.items():
-                if field in ["name", "color"]:
+                if field in TAG_UPDATE_FIELDS:
                     update_fields.append(f"{field} = ?")
                     update_values.append(value)
 
@@ -943,8 +1081,9 @@ class SQLiteStorage:
         finally:
             conn.close()
     
-    def search_prompts(self, query: str = "", category: str = "", category_id: str = "") -> List[Dict[str, Any]]:
-        """搜索提示词"""
+    def search_prompts(self, query: str = "", category: str = "", category_id: str = "",
+                       tags: List[str] = ()) -> List[Dict[str, Any]]:
+        """搜索提示词（tags非空时只返回包含其中任一标签的提示词）"""
         conn = self._get_connection()
         try:
             cursor = conn.cursor()
@@ -954,9 +1093,16 @@ class SQLiteStorage:
             params = []
             
             if query:
-                conditions.append("(p.title LIKE ? OR p.content LIKE ? OR p.description LIKE ?)")
-                query_param = f"%{query}%"
-                params.extend([query_param, query_param, query_param])
+                if self._fts_enabled and len(query) >= 3:
+                    # trigram全文索引：整个查询作为短语，等价于不区分大小写的子串匹配
+                    conditions.append("p.id IN (SELECT d.prompt_id FROM prompts_fts JOIN prompts_fts_docs d"
+                                      " ON d.docid = prompts_fts.rowid WHERE prompts_fts MATCH ?)")
+                    params.append('"' + query.replace('"', '""') + '"')
+                else:
+                    # trigram无法索引少于3个字符的查询，回退为LIKE
+                    conditions.append("(p.title LIKE ? OR p.content LIKE ? OR p.description LIKE ?)")
+                    query_param = f"%{query}%"
+                    params.extend([query_param, query_param, query_param])
             
             if category_id:
                 # 按分类ID搜索，包括其子分类
@@ -969,6 +1115,17 @@ class SQLiteStorage:
                 # 按分类名称搜索（向后兼容）
                 conditions.append("p.category_name = ?")
                 params.append(category)
+
+            if tags:
+                # 通过prompt_tags关联表（按tag_id索引）筛选，不在Python中逐条过滤
+                tags = list(tags)
+                placeholders = ','.join(['?' for _ in tags])
+                conditions.append(f"""p.id IN (
+                    SELECT pt2.prompt_id FROM prompt_tags pt2
+                    JOIN tags t2 ON t2.id = pt2.tag_id
+                    WHERE t2.name IN ({placeholders})
+                )""")
+                params.extend(tags)
             
             # 构建SQL
             sql = """
@@ -1003,8 +1160,6 @@ class SQLiteStorage:
     # 数据管理方法
     def backup_data(self) -> str:
         """备份数据（复制数据库文件）"""
-        import shutil
-
         # 创建备份目录
         backup_dir = Path("data/backup")
         backup_dir.mkdir(exist_ok=True)
@@ -1013,15 +1168,12 @@ class SQLiteStorage:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_file = backup_dir / f"prompthub_backup_{timestamp}.db"
 
-        # 复制数据库文件
-        shutil.copy2(self.db_path, backup_file)
+        self._copy_database_to(backup_file)
 
         return str(backup_file)
 
     def export_database(self) -> str:
         """导出数据库文件"""
-        import shutil
-
         # 创建导出目录
         export_dir = Path("data/exports")
         export_dir.mkdir(exist_ok=True)
@@ -1030,15 +1182,25 @@ class SQLiteStorage:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         export_file = export_dir / f"prompthub_export_{timestamp}.db"
 
-        # 复制数据库文件
-        shutil.copy2(self.db_path, export_file)
+        self._copy_database_to(export_file)
 
         return str(export_file)
 
+    def _copy_database_to(self, target_file):
+        """
+        通过SQLite在线备份接口复制数据库：得到一致的快照，包含WAL中尚未写回数据库文件的内容
+        （WAL模式下直接复制数据库文件会丢失这部分数据）
+        """
+        source = sqlite3.connect(self.db_path)
+        target = sqlite3.connect(str(target_file))
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
     def import_database(self, db_file_path: str) -> str:
         """导入数据库文件（替换当前数据库）"""
-        import shutil
-
         # 先备份当前数据库
         backup_file = self.backup_data()
 
@@ -1060,8 +1222,23 @@ class SQLiteStorage:
         except sqlite3.Error as e:
             raise ValueError(f"导入的文件不是有效的SQLite数据库: {str(e)}")
 
-        # 替换当前数据库
-        shutil.copy2(import_file, self.db_path)
+        # 替换当前数据库：通过备份接口写入当前数据库，WAL模式下也不会与WAL文件中的旧数据混淆
+        source = sqlite3.connect(str(import_file))
+        target = sqlite3.connect(self.db_path)
+        try:
+            try:
+                source.backup(target)
+            except sqlite3.OperationalError:
+                # 页大小不同时无法备份到WAL模式的数据库：先把WAL写回并清空，再直接替换文件
+                target.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                shutil.copy2(import_file, self.db_path)
+        finally:
+            target.close()
+            source.close()
+        self._reset_revision()
+
+        # 导入的数据库可能来自旧版本，没有全文索引
+        self._fts_enabled = self._ensure_fts()
 
         return backup_file
 
@@ -1431,6 +1608,9 @@ CSS 代码：
         skip_count = 0
         update_count = 0
 
+        # 整个导入使用同一个时间戳
+        now = datetime.now().isoformat()
+
         conn = self._get_connection()
         try:
             cursor = conn.cursor()
@@ -1460,14 +1640,12 @@ CSS 代码：
 
                     # 导入版本信息（如果有）
                     if 'versions' in prompt:
-                        self._import_prompt_versions(cursor, prompt_id, prompt['versions'])
+                        self._import_prompt_versions(cursor, prompt_id, prompt['versions'], now)
 
                     update_count += 1
                 else:
                     # 创建新提示词
                     # 使用传入的ID而不是生成新ID
-                    now = datetime.now().isoformat()
-
                     # 获取分类信息
                     category_id = prompt.get("category_id")
                     category_name = prompt.get("category", "其他")
@@ -1503,7 +1681,7 @@ CSS 代码：
 
                     # 插入版本信息
                     if 'versions' in prompt and prompt['versions']:
-                        self._import_prompt_versions(cursor, prompt_id, prompt['versions'])
+                        self._import_prompt_versions(cursor, prompt_id, prompt['versions'], now)
                     else:
                         # 创建默认版本
                         cursor.execute("""
@@ -1537,8 +1715,10 @@ CSS 代码：
         finally:
             conn.close()
 
-    def _import_prompt_versions(self, cursor: sqlite3.Cursor, prompt_id: str, versions: List[Dict[str, Any]]):
-        """导入提示词的版本信息"""
+    def _import_prompt_versions(self, cursor: sqlite3.Cursor, prompt_id: str, versions: List[Dict[str, Any]],
+                                now: Optional[str] = None):
+        """导入提示词的版本信息，now为缺少创建时间的版本使用的时间戳"""
+        now = now or datetime.now().isoformat()
         # 先删除现有版本
         cursor.execute("DELETE FROM prompt_versions WHERE prompt_id = ?", (prompt_id,))
 
@@ -1555,5 +1735,5 @@ CSS 代码：
                 version.get("content", ""),
                 version.get("description", ""),
                 version.get("change_note", ""),
-                version.get("created_at", datetime.now().isoformat())
+                version.get("created_at", now)
             ))
\ No newline at end of file
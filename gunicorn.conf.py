@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gunicorn配置：gunicorn -c gunicorn.conf.py 'app:create_app()'
+"""
+
+bind = "0.0.0.0:5001"
+worker_class = "gthread"
+workers = 4
+threads = 8
+
+
+def on_starting(server):
+    """
+    在master进程fork worker之前执行一次数据迁移。
+    迁移失败只能使用JSON文件存储时，各进程的内存数据会互相覆盖，因此强制只启动一个worker
+    """
+    from app import prepare_storage
+
+    if prepare_storage() == "file" and server.num_workers > 1:
+        server.log.warning("使用JSON文件存储，只支持单进程运行，worker数量由%d改为1", server.num_workers)
+        server.num_workers = 1
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP接口测试（Flask测试客户端），每个用例分别在JSON文件存储和SQLite存储上运行
+在项目根目录运行：python -m unittest
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import app
+from app import FileStorage
+from database.sqlite_storage import SQLiteStorage
+
+
+class ApiTestMixin:
+    """每个测试使用独立的临时存储，替换app模块中的存储实例"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, ignore_errors=True)
+        self.storage = self.make_storage()
+        self.addCleanup(setattr, app, "storage", app.storage)
+        app.storage = self.storage
+        self.client = app.app.test_client()
+
+    def make_storage(self):
+        raise NotImplementedError
+
+    def titles(self):
+        return sorted(p["title"] for p in self.storage.get_all_prompts())
+
+
+class FileStorageMixin:
+    def make_storage(self):
+        storage = FileStorage(self.data_dir)
+        self.addCleanup(storage._flush_now)
+        return storage
+
+
+class SQLiteStorageMixin:
+    def make_storage(self):
+        return SQLiteStorage(os.path.join(self.data_dir, "prompthub.db"))
+
+
+class BulkPromptsTests(ApiTestMixin):
+    """批量创建/更新提示词：整批校验，不合法时不做任何修改"""
+
+    def test_bulk_create(self):
+        response = self.client.post("/api/prompts/bulk", json=[
+            {"title": "a", "content": "c", "tags": ["x"]},
+            {"title": "b", "content": "c"},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([p["title"] for p in response.get_json()], ["a", "b"])
+        self.assertEqual(self.titles(), ["a", "b"])
+
+    def test_bulk_create_rejects_invalid_item_mid_batch(self):
+        response = self.client.post("/api/prompts/bulk", json=[
+            {"title": "a", "content": "c"},
+            {"title": "b"},
+            {"title": "d", "content": "c"},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["index"], 1)
+        self.assertEqual(self.titles(), [])
+
+        response = self.client.post("/api/prompts/bulk", json=[{"title": "a", "content": "c", "tags": "x"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.titles(), [])
+
+    def test_bulk_create_requires_array(self):
+        for body in ({"title": "a", "content": "c"}, [1, 2], None):
+            response = self.client.post("/api/prompts/bulk", json=body)
+            self.assertEqual(response.status_code, 400)
+
+    def test_bulk_update_with_unknown_id(self):
+        prompt = self.storage.create_prompt({"title": "a", "content": "c"})
+        response = self.client.put("/api/prompts/bulk", json=[
+            {"id": "missing", "title": "x"},
+            {"id": prompt["id"], "title": "a2"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()
+        self.assertIsNone(results[0])
+        self.assertEqual(results[1]["title"], "a2")
+        self.assertEqual(self.titles(), ["a2"])
+
+    def test_bulk_update_rejects_invalid_item_mid_batch(self):
+        first = self.storage.create_prompt({"title": "a", "content": "c"})
+        second = self.storage.create_prompt({"title": "b", "content": "c"})
+        response = self.client.put("/api/prompts/bulk", json=[
+            {"id": first["id"], "title": "a2"},
+            {"id": second["id"], "title": ""},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["index"], 1)
+        self.assertEqual(self.titles(), ["a", "b"])
+
+        response = self.client.put("/api/prompts/bulk", json=[{"id": first["id"]}, {"title": "x"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.titles(), ["a", "b"])
+
+
+class FileStorageBulkPromptsTest(FileStorageMixin, BulkPromptsTests, unittest.TestCase):
+    pass
+
+
+class SQLiteStorageBulkPromptsTest(SQLiteStorageMixin, BulkPromptsTests, unittest.TestCase):
+    pass
+
+
+class RevisionEtagTests(ApiTestMixin):
+    """只读接口的ETag：数据未变化时返回304，写入后ETag改变"""
+
+    def get(self, path, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get(path, headers=headers)
+
+    def test_not_modified_until_write(self):
+        for path in ("/api/categories", "/api/tags", "/api/stats"):
+            response = self.get(path)
+            self.assertEqual(response.status_code, 200)
+            etag = response.headers["ETag"]
+            self.assertEqual(response.headers["Cache-Control"], "no-cache")
+
+            response = self.get(path, etag)
+            self.assertEqual(response.status_code, 304, path)
+            self.assertEqual(response.headers["ETag"], etag)
+            self.assertEqual(response.data, b"")
+
+            self.storage.create_prompt({"title": path, "content": "c", "tags": [path]})
+            response = self.get(path, etag)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_cached_response_reflects_write(self):
+        response = self.get("/api/categories")
+        names = [c["name"] for c in response.get_json()]
+        self.storage.create_category({"name": "新分类"})
+
+        response = self.get("/api/categories", response.headers["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(c["name"] for c in response.get_json()), sorted(names + ["新分类"]))
+
+    def test_etag_depends_on_query(self):
+        prompt = self.storage.create_prompt({"title": "a", "content": "c"})
+        self.storage.create_prompt_version(prompt["id"], {"version": "2.0", "title": "a", "content": "v2"})
+        path = f"/api/prompts/{prompt['id']}/versions"
+        etag = self.get(path).headers["ETag"]
+        self.assertNotEqual(self.get(path + "?x=1").headers["ETag"], etag)
+        self.assertEqual(self.get(path, etag).status_code, 304)
+
+
+class FileStorageRevisionEtagTest(FileStorageMixin, RevisionEtagTests, unittest.TestCase):
+    pass
+
+
+class SQLiteStorageRevisionEtagTest(SQLiteStorageMixin, RevisionEtagTests, unittest.TestCase):
+
+    def test_write_from_another_process(self):
+        etag = self.get("/api/categories").headers["ETag"]
+        # 另一个worker进程的存储实例（独立连接）写入后，本进程的ETag也应变化
+        SQLiteStorage(self.storage.db_path).create_category({"name": "其它进程"})
+        response = self.get("/api/categories", etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("其它进程", [c["name"] for c in response.get_json()])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FileStorage（JSON文件存储）测试
+在项目根目录运行：python -m unittest
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import app
+from app import FileStorage
+
+
+class FileStorageTestCase(unittest.TestCase):
+    """每个测试使用独立的临时数据目录"""
+
+    storage_options = {}
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, ignore_errors=True)
+        self.storage = self.make_storage()
+
+    def make_storage(self):
+        return self.open_storage()
+
+    def open_storage(self):
+        """打开数据目录，测试结束时先落盘再删除目录"""
+        storage = FileStorage(self.data_dir, **self.storage_options)
+        self.addCleanup(storage._flush_now)
+        return storage
+
+
+class SearchIndexTest(FileStorageTestCase):
+    """启用三字组倒排索引时的搜索"""
+
+    storage_options = {"search_index": True}
+
+    def test_query_matching_nothing_returns_empty(self):
+        self.storage.create_prompt({"title": "t", "content": "Some CONTENT here"})
+        self.assertEqual(self.storage.search_prompts("nothing like this"), [])
+
+    def test_query_after_content_changed(self):
+        prompt = self.storage.create_prompt({"title": "t", "content": "Some CONTENT here"})
+        self.assertEqual([p["id"] for p in self.storage.search_prompts("content")], [prompt["id"]])
+
+        self.storage.update_prompt(prompt["id"], {"content": "changed"})
+        self.assertEqual(self.storage.search_prompts("content"), [])
+        self.assertEqual([p["id"] for p in self.storage.search_prompts("change")], [prompt["id"]])
+
+
+class LegacyDataTest(FileStorageTestCase):
+    """加载旧版数据文件"""
+
+    def make_storage(self):
+        legacy = {
+            "prompts": [{"id": "p1", "title": "t", "content": "c", "category": "编程", "tags": []}],
+            "metadata": {"categories": [{"id": "c1", "name": "编程", "color": "#3B82F6"}], "tags": []},
+        }
+        with open(os.path.join(self.data_dir, "prompts.json"), "w", encoding="utf-8") as f:
+            json.dump(legacy, f, ensure_ascii=False)
+        return self.open_storage()
+
+    def test_categories_without_hierarchy_fields(self):
+        category = self.storage.get_all_categories()[0]
+        self.assertEqual((category["parent_id"], category["level"], category["path"]), (None, 1, "编程"))
+        self.assertEqual([c["id"] for c in self.storage.get_categories_tree()], ["c1"])
+        self.assertEqual(len(self.storage.search_prompts("", category_id="c1")), 0)
+
+
+class ReconcileTagsTest(FileStorageTestCase):
+    """提示词引用了未定义标签的旧数据"""
+
+    def make_storage(self):
+        legacy = {
+            "prompts": [{"id": "p1", "title": "t", "content": "c", "category": "其他", "tags": ["orphan"]}],
+            "metadata": {"categories": [], "tags": []},
+        }
+        with open(os.path.join(self.data_dir, "prompts.json"), "w", encoding="utf-8") as f:
+            json.dump(legacy, f, ensure_ascii=False)
+        return self.open_storage()
+
+    def test_auto_tag_id_survives_restart(self):
+        tag_id = self.storage.get_all_tags()[0]["id"]
+        self.storage._flush_now()
+
+        reloaded = self.open_storage()
+        self.assertEqual([t["id"] for t in reloaded.get_all_tags()], [tag_id])
+        self.assertIsNotNone(reloaded.update_tag(tag_id, {"color": "#000000"}))
+
+
+class DeleteCategoryTest(FileStorageTestCase):
+    """删除多级分类：影响统计与强制删除"""
+
+    def setUp(self):
+        super().setUp()
+        self.parent = self.storage.create_category({"name": "父"})
+        self.child = self.storage.create_category({"name": "子", "parent_id": self.parent["id"]})
+        self.grandchild = self.storage.create_category({"name": "孙", "parent_id": self.child["id"]})
+        self.sibling = self.storage.create_category({"name": "兄弟", "parent_id": self.parent["id"]})
+        self.in_parent = self.storage.create_prompt({"title": "p", "content": "c", "category_id": self.parent["id"]})
+        # 旧数据中只有分类名、没有category_id的提示词
+        self.by_name = self.storage.create_prompt({"title": "n", "content": "c", "category": "子"})
+        self.in_grandchild = self.storage.create_prompt({"title": "g", "content": "c",
+                                                         "category_id": self.grandchild["id"]})
+        self.elsewhere = self.storage.create_prompt({"title": "e", "content": "c", "category": "编程"})
+
+    def test_reports_impact_without_deleting(self):
+        result = self.storage.delete_category(self.parent["id"])
+        self.assertEqual(result["requires_confirmation"], True)
+        self.assertEqual(result["child_categories_count"], 2)
+        self.assertEqual(sorted(result["child_categories"]), ["兄弟", "子"])
+        self.assertEqual(result["affected_prompts_count"], 1)
+        self.assertEqual(self.storage.delete_category(self.child["id"])["affected_prompts_count"], 1)
+        self.assertEqual(len(self.storage.get_all_categories()), len(self.storage._cats_by_id))
+        self.assertFalse(self.storage.delete_category("missing")["success"])
+
+    def test_force_delete_nested(self):
+        self.assertEqual(sorted(self.storage.get_category_descendants(self.parent["id"])),
+                         sorted([self.child["id"], self.grandchild["id"], self.sibling["id"]]))
+        result = self.storage.force_delete_category(self.child["id"])
+        self.assertEqual((result["deleted_categories_count"], result["affected_prompts_count"]), (2, 2))
+
+        remaining = {c["id"] for c in self.storage.get_all_categories()}
+        self.assertNotIn(self.grandchild["id"], remaining)
+        self.assertIn(self.sibling["id"], remaining)
+        self.assertEqual(self.storage.get_category_descendants(self.parent["id"]), [self.sibling["id"]])
+        for prompt in (self.by_name, self.in_grandchild):
+            self.assertEqual(self.storage.get_prompt_by_id(prompt["id"])["category"], "其他")
+        self.assertEqual(self.storage.get_prompt_by_id(self.in_parent["id"])["category"], "父")
+        self.assertEqual(self.storage.get_prompt_by_id(self.elsewhere["id"])["category"], "编程")
+
+        # 索引随删除更新：再次统计父分类只剩直属提示词
+        result = self.storage.delete_category(self.parent["id"])
+        self.assertEqual((result["child_categories_count"], result["affected_prompts_count"]), (1, 1))
+
+
+class DuplicateTagNameTest(FileStorageTestCase):
+    """允许多个同名标签定义：删除或改名其中一个后，名称仍指向剩余的定义"""
+
+    def tag_colors(self, storage):
+        return [(t["name"], t["color"]) for t in storage.get_all_tags()]
+
+    def assert_survives_reload(self):
+        expected = self.tag_colors(self.storage)
+        self.storage._flush_now()
+        self.assertEqual(self.tag_colors(self.open_storage()), expected)
+
+    def test_delete_one_of_two(self):
+        self.storage.create_tag({"name": "t3", "color": "#111111"})
+        second = self.storage.create_tag({"name": "t3", "color": "#222222"})
+        self.storage.delete_tag(second["id"])
+        self.storage.create_prompt({"title": "t", "content": "c", "tags": ["t3"]})
+
+        self.assertEqual(self.tag_colors(self.storage), [("t3", "#111111")])
+        self.assertEqual(len(self.storage._load_data()["metadata"]["tags"]), 1)
+        self.assert_survives_reload()
+
+    def test_rename_away_from_shared_name(self):
+        self.storage.create_tag({"name": "t3", "color": "#111111"})
+        second = self.storage.create_tag({"name": "t3", "color": "#222222"})
+        self.storage.update_tag(second["id"], {"name": "t4"})
+        self.storage.create_prompt({"title": "t", "content": "c", "tags": ["t3", "t4"]})
+
+        self.assertEqual(sorted(self.tag_colors(self.storage)), [("t3", "#111111"), ("t4", "#222222")])
+        self.assert_survives_reload()
+
+    def test_rename_onto_name_defined_later(self):
+        first = self.storage.create_tag({"name": "t3", "color": "#111111"})
+        self.storage.create_tag({"name": "t4", "color": "#222222"})
+        self.storage.update_tag(first["id"], {"name": "t4"})
+        self.storage.create_prompt({"title": "t", "content": "c", "tags": ["t4"]})
+
+        self.assertEqual(self.tag_colors(self.storage), [("t4", "#222222")])
+        self.assert_survives_reload()
+
+
+class OpLogTest(FileStorageTestCase):
+    """操作日志：快照写入前崩溃时，重新打开数据目录应重放日志恢复全部修改"""
+
+    def make_storage(self):
+        storage = self.open_storage()
+        # 后台线程不自动写快照，由测试决定何时写入或"崩溃"
+        storage._flush_delay = 3600
+        return storage
+
+    def crash(self, storage):
+        """模拟进程崩溃：丢弃实例且不再写快照（已写入的操作日志保留）"""
+        with storage._lock:
+            storage._pending = False
+            storage._ops_since_snapshot = 0
+
+    def reopen(self):
+        self.crash(self.storage)
+        self.storage = self.make_storage()
+        return self.storage
+
+    def titles(self):
+        return sorted(p["title"] for p in self.storage.get_all_prompts())
+
+    def test_replays_ops_after_crash(self):
+        kept = self.storage.create_prompt({"title": "kept", "content": "c"})
+        edited = self.storage.create_prompt({"title": "edited", "content": "c"})
+        dropped = self.storage.create_prompt({"title": "dropped", "content": "c"})
+        self.storage.update_prompt(edited["id"], {"title": "edited2"})
+        self.storage.delete_prompt(dropped["id"])
+        self.storage.create_prompt_version(kept["id"], {"version": "2.0", "title": "kept", "content": "v2"})
+
+        self.reopen()
+        self.assertEqual(self.titles(), ["edited2", "kept"])
+        self.assertEqual(self.storage.get_prompt_by_id(kept["id"])["content"], "v2")
+
+    def test_clear_all_data_then_crash(self):
+        for i in range(3):
+            self.storage.create_prompt({"title": f"old{i}", "content": "c"})
+        self.storage._flush_now()
+
+        self.storage.clear_all_data()
+        self.storage.create_prompt({"title": "new", "content": "c"})
+        self.reopen()
+        self.assertEqual(self.titles(), ["new"])
+
+    def test_load_test_data_then_crash(self):
+        self.storage.create_prompt({"title": "old", "content": "c"})
+        self.storage._flush_now()
+        os.mkdir(os.path.join(self.data_dir, "examples"))
+        with open(os.path.join(self.data_dir, "examples", "prompts.json"), "w", encoding="utf-8") as f:
+            json.dump({"prompts": [{"id": "e1", "title": "example", "content": "c",
+                                    "category": "其他", "tags": ["demo"]}]}, f)
+
+        self.storage.load_test_data()
+        self.storage.create_prompt({"title": "new", "content": "c"})
+        self.reopen()
+        self.assertEqual(self.titles(), ["example", "new"])
+        self.assertEqual([t["name"] for t in self.storage.get_all_tags()], ["demo"])
+
+    def test_compaction_merges_log_into_snapshot(self):
+        self.storage._compact_threshold = 3
+        for i in range(3):
+            self.storage.create_prompt({"title": f"p{i}", "content": "c"})
+        self.assertTrue(self.storage._dirty.is_set())
+
+        self.storage._flush_now()
+        self.assertFalse(os.path.exists(os.path.join(self.data_dir, "ops.log")))
+        self.storage.create_prompt({"title": "p3", "content": "c"})
+        self.reopen()
+        self.assertEqual(self.titles(), ["p0", "p1", "p2", "p3"])
+
+    def test_failed_snapshot_keeps_rotated_log(self):
+        self.storage.create_prompt({"title": "a", "content": "c"})
+        write_file = self.storage._write_file
+
+        def fail(buf):
+            raise OSError("disk full")
+        self.storage._write_file = fail
+        with self.assertRaises(OSError):
+            self.storage._flush_now()
+        self.assertTrue(os.path.exists(os.path.join(self.data_dir, "ops.log.old")))
+
+        self.storage._write_file = write_file
+        self.storage.create_prompt({"title": "b", "content": "c"})
+        self.reopen()
+        self.assertEqual(self.titles(), ["a", "b"])
+
+        self.storage._flush_now()
+        self.assertEqual(sorted(n for n in os.listdir(self.data_dir) if n.startswith("ops.log")), [])
+
+    def test_torn_last_line_is_ignored(self):
+        self.storage.create_prompt({"title": "a", "content": "c"})
+        self.crash(self.storage)
+        with open(os.path.join(self.data_dir, "ops.log"), "ab") as f:
+            f.write(b'{"op": "put", "kind": "prompt", "obj": {"id"')
+
+        self.storage = self.make_storage()
+        self.assertEqual(self.titles(), ["a"])
+
+
+class CompressionTest(FileStorageTestCase):
+    """压缩格式的数据文件：写入后重新打开能读回，切换压缩配置时沿用最新的数据"""
+
+    codecs = {"gzip": ("prompts.json.gz", b"\x1f\x8b"), "zstd": ("prompts.json.zst", b"\x28\xb5\x2f\xfd")}
+
+    def open_as(self, compress):
+        self.storage._flush_now()
+        self.storage = FileStorage(self.data_dir, compress=compress)
+        self.addCleanup(self.storage._flush_now)
+        return self.storage
+
+    def titles(self):
+        return sorted(p["title"] for p in self.storage.get_all_prompts())
+
+    def check_round_trip(self, codec):
+        name, magic = self.codecs[codec]
+        self.open_as(codec)
+        self.storage.create_prompt({"title": "中文标题", "content": "c" * 1000, "tags": ["t"]})
+        self.storage._flush_now()
+        with open(os.path.join(self.data_dir, name), "rb") as f:
+            self.assertEqual(f.read(len(magic)), magic)
+
+        self.open_as(codec)
+        self.assertEqual(self.titles(), ["中文标题"])
+        self.assertEqual(self.storage.get_all_prompts()[0]["content"], "c" * 1000)
+        self.assertEqual([t["name"] for t in self.storage.get_all_tags()], ["t"])
+
+    def test_gzip_round_trip(self):
+        self.check_round_trip("gzip")
+
+    @unittest.skipIf(app.zstandard is None, "未安装zstandard")
+    def test_zstd_round_trip(self):
+        self.check_round_trip("zstd")
+
+    @unittest.skipIf(app.zstandard is not None, "已安装zstandard")
+    def test_zstd_falls_back_to_gzip(self):
+        self.assertEqual(self.open_as("zstd").data_file.name, "prompts.json.gz")
+
+    def test_switching_keeps_latest_data(self):
+        self.storage.create_prompt({"title": "plain", "content": "c"})
+        self.open_as("gzip")
+        self.assertEqual(self.titles(), ["plain"])
+        self.storage.create_prompt({"title": "gzip", "content": "c"})
+
+        # 关闭压缩：prompts.json比压缩文件旧，应沿用压缩文件中的数据
+        self.open_as(False)
+        self.assertEqual(self.titles(), ["gzip", "plain"])
+        self.storage.create_prompt({"title": "plain2", "content": "c"})
+
+        self.open_as(True)
+        self.assertEqual(self.titles(), ["gzip", "plain", "plain2"])
+
+    def test_switching_with_unmerged_log(self):
+        self.open_as("gzip")
+        self.storage.create_prompt({"title": "a", "content": "c"})
+        # 模拟快照写入前崩溃：操作日志中的修改在切换格式后仍会重放
+        with self.storage._lock:
+            self.storage._pending = False
+            self.storage._ops_since_snapshot = 0
+        self.storage = FileStorage(self.data_dir)
+        self.addCleanup(self.storage._flush_now)
+        self.assertEqual(self.titles(), ["a"])
+
+
+@unittest.skipIf(app.fcntl is None, "平台不支持fcntl")
+class ProcessLockTest(FileStorageTestCase):
+    """数据目录同一时间只能被一个进程的FileStorage使用"""
+
+    def open_in_other_process(self):
+        code = "import sys; from app import FileStorage; FileStorage(sys.argv[1])"
+        return subprocess.run([sys.executable, "-c", code, self.data_dir], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    def test_other_process_is_refused(self):
+        result = self.open_in_other_process()
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("RuntimeError", result.stderr)
+
+    def test_reopening_and_closing_lock_file_keeps_lock(self):
+        self.open_storage()
+        # POSIX记录锁会在进程关闭该文件的任意描述符时释放，flock不会
+        open(os.path.join(self.data_dir, ".filestorage.lock")).close()
+        self.assertNotEqual(self.open_in_other_process().returncode, 0)
+
+
+class CorruptDataTest(FileStorageTestCase):
+    """数据文件损坏时使用默认数据重新初始化"""
+
+    def make_storage(self):
+        with open(os.path.join(self.data_dir, "prompts.json"), "w", encoding="utf-8") as f:
+            f.write("{not json")
+        return self.open_storage()
+
+    def test_recovers_with_default_data(self):
+        self.assertEqual(self.storage.get_all_prompts(), [])
+        self.assertTrue(self.storage.get_all_categories())
+        self.assertTrue(any(name.startswith("prompts.json.corrupt-") for name in os.listdir(self.data_dir)))
+
+        self.storage._flush_now()
+        with open(os.path.join(self.data_dir, "prompts.json"), encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["prompts"], [])
+
+
+class CorruptCompressedDataTest(FileStorageTestCase):
+    """压缩数据文件损坏时不沿用过时的未压缩prompts.json"""
+
+    storage_options = {"compress": "gzip"}
+
+    def make_storage(self):
+        legacy = {"prompts": [{"id": "old", "title": "stale", "content": "c", "category": "其他", "tags": []}],
+                  "metadata": {"categories": [], "tags": []}}
+        with open(os.path.join(self.data_dir, "prompts.json"), "w", encoding="utf-8") as f:
+            json.dump(legacy, f)
+        with open(os.path.join(self.data_dir, "prompts.json.gz"), "wb") as f:
+            f.write(b"not gzip")
+        return self.open_storage()
+
+    def test_recovers_with_default_data(self):
+        self.assertEqual(self.storage.get_all_prompts(), [])
+        self.assertTrue(any(name.startswith("prompts.json.gz.corrupt-") for name in os.listdir(self.data_dir)))
+
+        # 写入快照前崩溃：重新打开时仍是默认数据（操作日志中记录了整体替换）
+        with self.storage._lock:
+            self.storage._pending = False
+            self.storage._ops_since_snapshot = 0
+        self.assertEqual(self.open_storage().get_all_prompts(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLiteStorage（SQLite存储）测试
+在项目根目录运行：python -m unittest
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from database.sqlite_storage import SQLiteStorage
+
+
+class SQLiteStorageTestCase(unittest.TestCase):
+    """每个测试使用独立的临时数据库"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, ignore_errors=True)
+        self.db_path = os.path.join(self.data_dir, "prompthub.db")
+        self.storage = SQLiteStorage(self.db_path)
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path)
+        self.addCleanup(conn.close)
+        return conn
+
+
+class FullTextSearchTest(SQLiteStorageTestCase):
+    """全文索引不依赖prompts表的隐式rowid"""
+
+    def search_ids(self, query):
+        return sorted(p["id"] for p in self.storage.search_prompts(query))
+
+    def test_search_after_rowids_renumbered(self):
+        ids = [self.storage.create_prompt({"title": f"t{i}", "content": "zebra" if i % 2 else "horse"})["id"]
+               for i in range(6)]
+        self.storage.delete_prompt(ids[0])
+
+        # VACUUM可能重新编号没有INTEGER PRIMARY KEY的表的rowid，这里直接改写rowid模拟
+        conn = self.connect()
+        conn.execute("UPDATE prompts SET rowid = rowid + 1000")
+        conn.commit()
+        conn.execute("VACUUM")
+
+        self.assertEqual(self.search_ids("zebra"), sorted(ids[1::2]))
+        self.storage.update_prompt(ids[1], {"content": "horse"})
+        self.storage.delete_prompt(ids[3])
+        self.assertEqual(self.search_ids("zebra"), [ids[5]])
+        self.assertEqual(self.search_ids("horse"), sorted([ids[1], ids[2], ids[4]]))
+        conn.execute("INSERT INTO prompts_fts(prompts_fts, rank) VALUES ('integrity-check', 1)")
+
+    def test_upgrades_rowid_keyed_index(self):
+        prompt = self.storage.create_prompt({"title": "t", "content": "zebra"})
+        conn = self.connect()
+        conn.executescript("""
+            DROP TRIGGER prompts_fts_ai;
+            DROP TRIGGER prompts_fts_ad;
+            DROP TRIGGER prompts_fts_au;
+            DROP TABLE prompts_fts;
+            DROP VIEW prompts_fts_content;
+            DROP TABLE prompts_fts_docs;
+            CREATE VIRTUAL TABLE prompts_fts USING fts5(
+                title, content, description,
+                content='prompts', content_rowid='rowid', tokenize='trigram'
+            );
+            INSERT INTO prompts_fts(prompts_fts) VALUES ('rebuild');
+        """)
+
+        self.storage = SQLiteStorage(self.db_path)
+        self.assertEqual(self.search_ids("zebra"), [prompt["id"]])
+        sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'prompts_fts'").fetchone()[0]
+        self.assertIn("prompts_fts_content", sql)
+
+
+if __name__ == "__main__":
+    unittest.main()